@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image, UnidentifiedImageError
+
+class AlbumArtCache:
+    """
+    Caches album art by URL as decoded, already resized RGBA images.
+
+    Lookups go memory (bounded LRU) -> disk cache -> network. Disk entries older than
+    `ttl` are revalidated with ETag / Last-Modified so unchanged art is not downloaded again.
+    `lock` only guards the in-memory LRU and failure times, so peek() never waits for disk or network;
+    disk reads and writes are serialised by `disk_lock` instead.
+    """
+
+    def __init__(self, cache_dir="/home/volumio/Quadify/cache/albumart", size=(60, 60),
+                 max_items=32, max_disk_bytes=5 * 1024 * 1024, ttl=7 * 24 * 3600,
+                 failure_ttl=60, connect_timeout=1.0, read_timeout=3.0):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.max_items = max_items
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl  # Seconds to wait before retrying a URL that failed
+        self.timeout = (connect_timeout, read_timeout)  # Same bounds as the Volumio REST client
+        self.memory = OrderedDict()  # url -> (image, fetched_at)
+        self.failures = {}  # url -> time of last failure
+        self.lock = threading.RLock()
+        self.disk_lock = threading.Lock()
+
+        # Keep-alive connections per art host, so revalidating many small station logos stays cheap
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError as e:
+            print(f"[AlbumArtCache] Could not create cache directory {self.cache_dir}: {e}")
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + ".png", base + ".json"
+
+    def peek(self, url):
+        """Returns (image, is_fresh) from the in-memory LRU only; never touches disk or network."""
+        with self.lock:
+            entry = self.memory.get(url)
+            if not entry:
+                return None, False
+            self.memory.move_to_end(url)
+            return entry[0], time.time() - entry[1] < self.ttl
+
+    def get(self, url):
+        """Returns the art for `url`, fetching or revalidating it if needed. None if unavailable."""
+        return self.lookup(url)[0]
+
+    def lookup(self, url):
+        """
+        Like get(), but returns (image, network_failed). `network_failed` is True only when a download
+        was attempted and the host could not be reached or answered with a server error, not when the
+        URL is still inside its failure window or the reply was not usable art.
+        """
+        if not url:
+            return None, False
+
+        with self.lock:
+            entry = self.memory.get(url)
+            if entry and time.time() - entry[1] < self.ttl:
+                self.memory.move_to_end(url)
+                return entry[0], False
+            last_failure = self.failures.get(url)
+
+        with self.disk_lock:
+            image, meta = self._load_from_disk(url)
+        if image is not None and time.time() - meta.get("fetched_at", 0) < self.ttl:
+            with self.lock:
+                self._remember(url, image, meta["fetched_at"])
+            return image, False
+
+        if last_failure and time.time() - last_failure < self.failure_ttl:
+            # Stale art (or None) rather than hammering a failing URL
+            if image is not None:
+                with self.lock:
+                    self._remember_stale(url, image)
+            return image, False
+
+        network_failed = False
+        try:
+            fetched = self._fetch(url, meta if image is not None else {})
+        except requests.RequestException:
+            print("Could not load album art (network error).")
+            fetched = None
+            network_failed = True
+
+        if fetched is None:
+            with self.lock:
+                self.failures[url] = time.time()
+                if image is not None:
+                    self._remember_stale(url, image)
+            return image, network_failed
+
+        new_image, new_meta = fetched
+        with self.disk_lock:
+            if new_image is None:
+                # 304 Not Modified: the disk copy is still current
+                new_image = image
+                new_meta = dict(meta, fetched_at=time.time())
+                self._write_meta(url, new_meta)
+            else:
+                self._save_to_disk(url, new_image, new_meta)
+        with self.lock:
+            self.failures.pop(url, None)
+            self._remember(url, new_image, new_meta["fetched_at"])
+        return new_image, False
+
+    def _remember(self, url, image, fetched_at):
+        self.memory[url] = (image, fetched_at)
+        self.memory.move_to_end(url)
+        while len(self.memory) > self.max_items:
+            self.memory.popitem(last=False)
+
+    def _remember_stale(self, url, image):
+        """Keeps stale art in memory, treated as fresh until the failing URL may be retried."""
+        self._remember(url, image, time.time() - self.ttl + self.failure_ttl)
+
+    def _fetch(self, url, meta):
+        """
+        Downloads `url`, sending conditional headers from `meta`.
+        Returns (image, meta), (None, meta) on 304, or None if the reply is not usable art.
+        Raises requests.RequestException if the host cannot be reached or answers with a 5xx.
+        """
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None, meta
+        if response.status_code >= 500:
+            response.raise_for_status()
+        if not response.ok:
+            print(f"Could not load album art (HTTP {response.status_code}).")
+            return None
+        if not response.headers.get("Content-Type", "").startswith("image"):
+            print("Album art URL did not return an image.")
+            return None
+        try:
+            image = Image.open(BytesIO(response.content)).resize(self.size).convert("RGBA")
+        except (UnidentifiedImageError, IOError):
+            print("Could not load album art (unsupported format).")
+            return None
+
+        new_meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+        return image, new_meta
+
+    def _load_from_disk(self, url):
+        image_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with Image.open(image_path) as img:
+                image = img.convert("RGBA")
+            return image, meta
+        except (OSError, ValueError, UnidentifiedImageError):
+            return None, {}
+
+    def _write_meta(self, url, meta):
+        _, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "w") as f:
+                json.dump(meta, f)
+        except OSError as e:
+            print(f"[AlbumArtCache] Could not write cache metadata: {e}")
+
+    def _save_to_disk(self, url, image, meta):
+        image_path, _ = self._paths(url)
+        try:
+            image.save(image_path, "PNG")
+        except OSError as e:
+            print(f"[AlbumArtCache] Could not write cached art: {e}")
+            return
+        self._write_meta(url, meta)
+        self._enforce_disk_limit()
+
+    def _enforce_disk_limit(self):
+        """Deletes the least recently written entries until the cache fits in max_disk_bytes."""
+        try:
+            names = [name for name in os.listdir(self.cache_dir) if name.endswith(".png")]
+        except OSError:
+            return
+
+        entries = []
+        total = 0
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        while total > self.max_disk_bytes and entries:
+            _, size, path = entries.pop(0)
+            for stale_path in (path, path[:-len(".png")] + ".json"):
+                try:
+                    os.remove(stale_path)
+                except OSError:
+                    pass
+            total -= size
+
+
+class AlbumArtFetcher:
+    """
+    Resolves album art off the render thread.
+
+    `get_nowait` only looks in memory and returns immediately; misses are handed to a small
+    worker pool that reads through the AlbumArtCache. Concurrent requests for the same URL share
+    one fetch, and hosts that keep failing to answer are backed off exponentially. Art served by
+    Volumio itself is backed off per URL instead, so one broken album does not hide every cover.
+    """
+
+    def __init__(self, cache=None, max_workers=2, base_url="http://localhost:3000",
+                 base_backoff=5, max_backoff=300):
+        self.cache = cache or AlbumArtCache()
+        self.base_url = base_url  # Volumio serves some art (e.g. /albumart?...) from relative paths
+        self.volumio_host = urlparse(base_url).netloc
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.in_flight = {}  # url -> Future
+        self.backoff = {}  # host, or URL on the Volumio host -> (consecutive network failures, retry_at)
+        self.listeners = []  # Callbacks called as listener(url, image) when art lands
+        self.lock = threading.Lock()
+
+    def resolve_url(self, url):
+        if url and url.startswith("/"):
+            return self.base_url + url
+        return url
+
+    def add_listener(self, callback):
+        with self.lock:
+            if callback not in self.listeners:
+                self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self.lock:
+            if callback in self.listeners:
+                self.listeners.remove(callback)
+
+    def get_nowait(self, url):
+        """Returns cached art for `url` (possibly stale) or None, scheduling a fetch if needed."""
+        url = self.resolve_url(url)
+        if not url:
+            return None
+        image, fresh = self.cache.peek(url)
+        if image is None or not fresh:
+            self.request(url)
+        return image
+
+    def prefetch(self, urls):
+        """Warms the cache for the given URLs in the background."""
+        for url in urls:
+            url = self.resolve_url(url)
+            if url:
+                image, fresh = self.cache.peek(url)
+                if image is None or not fresh:
+                    self.request(url)
+
+    def _backoff_key(self, url):
+        host = urlparse(url).netloc
+        return url if host == self.volumio_host else host
+
+    def request(self, url):
+        """Schedules a fetch of `url`. Returns the in-flight Future, or None if it is backing off."""
+        url = self.resolve_url(url)
+        key = self._backoff_key(url)
+        with self.lock:
+            future = self.in_flight.get(url)
+            if future:
+                return future
+            _, retry_at = self.backoff.get(key, (0, 0))
+            if time.time() < retry_at:
+                return None
+            future = self.executor.submit(self._fetch, url, key)
+            self.in_flight[url] = future
+        return future
+
+    def _fetch(self, url, key):
+        try:
+            image, network_failed = self.cache.lookup(url)
+        except Exception as e:
+            print(f"[AlbumArtFetcher] Error fetching {url}: {e}")
+            image, network_failed = None, False
+
+        with self.lock:
+            self.in_flight.pop(url, None)
+            if network_failed:
+                failures = self.backoff.get(key, (0, 0))[0] + 1
+                delay = min(self.max_backoff, self.base_backoff * 2 ** (failures - 1))
+                self.backoff[key] = (failures, time.time() + delay)
+                print(f"[AlbumArtFetcher] {key} failed {failures} time(s); backing off {delay}s.")
+            elif image is not None:
+                self.backoff.pop(key, None)
+            if image is None:
+                return None
+            listeners = list(self.listeners)
+
+        for listener in listeners:
+            try:
+                listener(url, image)
+            except Exception as e:
+                print(f"[AlbumArtFetcher] Error in listener {listener}: {e}")
+        return image
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
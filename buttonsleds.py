@@ -1,11 +1,12 @@
 import smbus
 import time
 import json
-import requests
+import queue
 import subprocess
-from socketIO_client_nexus import SocketIO
 from enum import Enum
 import threading
+import RPi.GPIO as GPIO
+from volumio_client import get_client
 
 # MCP23017 Register Definitions
 MCP23017_ADDRESS = 0x20
@@ -15,6 +16,12 @@ MCP23017_GPIOA = 0x12
 MCP23017_GPIOB = 0x13
 MCP23017_GPPUA = 0x0C
 MCP23017_GPPUB = 0x0D
+MCP23017_GPINTENB = 0x05
+MCP23017_INTCONB = 0x09
+MCP23017_IOCON = 0x0A
+MCP23017_INTCAPB = 0x11
+
+ROW_MASK = 0x3C  # GPIOB2-5 are matrix rows (inputs), GPIOB0-1 the columns (outputs)
 
 # Define LED Constants using Enum for clarity
 class LED(Enum):
@@ -27,17 +34,152 @@ class LED(Enum):
     LED7 = 0b00000010  # GPIOA1 - Button 5
     LED8 = 0b00000001  # GPIOA0 - Button 6
 
+STATUS_LEDS = LED.LED1.value | LED.LED2.value
+
+# Button command -> (Socket.IO event, state field it toggles or None)
+TRANSPORT_COMMANDS = {
+    "play": ("play", None),
+    "pause": ("pause", None),
+    "next": ("next", None),
+    "previous": ("prev", None),
+    "repeat": ("setRepeat", "repeat"),
+    "random": ("setRandom", "random"),
+}
+# Commands that are safe to repeat through the CLI when no pushState acknowledges them
+# (the CLI's repeat/random toggle, so a late acknowledgement would flip them back)
+IDEMPOTENT_COMMANDS = ("play", "pause")
+# State fields a transport command changes; other updates (e.g. optimistic volume) are not acknowledgements
+ACK_FIELDS = ("status", "position", "uri", "title", "repeat", "random")
+
+class LEDDriver:
+    """
+    Owns the MCP23017 GPIOA register. Other threads queue LED commands (set, clear, assign, flash,
+    blink); a single driver thread applies them and writes the resulting byte at most once per TICK,
+    and only when it changed. The thread sleeps until the next command or flash/blink deadline.
+    """
+    TICK = 0.02  # Minimum seconds between two I2C writes
+
+    def __init__(self, bus, address=MCP23017_ADDRESS, register=MCP23017_GPIOA):
+        self.bus = bus
+        self.address = address
+        self.register = register
+        self.commands = queue.SimpleQueue()
+        self.base = 0  # LEDs switched on with set/assign
+        self.flashes = {}  # mask -> time the flash ends
+        self.blinks = {}  # mask -> (on, off, start, end or None)
+        self.current = None  # Last byte written; None forces the first write
+        self.last_write_time = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def set(self, mask):
+        self.commands.put(("assign", mask, mask))
+
+    def clear(self, mask):
+        self.commands.put(("assign", mask, 0))
+
+    def assign(self, mask, value):
+        """Sets the LEDs in `mask` to the matching bits of `value` in one step."""
+        self.commands.put(("assign", mask, value))
+
+    def flash(self, mask, duration=0.2):
+        self.commands.put(("flash", mask, duration))
+
+    def blink(self, mask, on=0.5, off=0.5, duration=None):
+        """Blinks the LEDs in `mask` for `duration` seconds, or until stop_blink() when None."""
+        self.commands.put(("blink", mask, (on, off, duration)))
+
+    def stop_blink(self, mask):
+        self.commands.put(("stop_blink", mask, None))
+
+    def _apply(self, command, now):
+        op, mask, arg = command
+        if op == "assign":
+            self.base = (self.base & ~mask) | (arg & mask)
+        elif op == "flash":
+            self.flashes[mask] = max(self.flashes.get(mask, 0), now + arg)
+        elif op == "blink":
+            on, off, duration = arg
+            self.blinks[mask] = (on, off, now, now + duration if duration is not None else None)
+        elif op == "stop_blink":
+            self.blinks.pop(mask, None)
+
+    def _output(self, now):
+        """Returns the byte to show at `now` and the next time it can change by itself (or None)."""
+        value = self.base
+        deadline = None
+        for mask, end in list(self.flashes.items()):
+            if end <= now:
+                del self.flashes[mask]
+                continue
+            value |= mask
+            deadline = end if deadline is None else min(deadline, end)
+        for mask, (on, off, start, end) in list(self.blinks.items()):
+            if end is not None and end <= now:
+                del self.blinks[mask]
+                continue
+            phase = (now - start) % (on + off)
+            lit = phase < on
+            value = (value & ~mask) | (mask if lit else 0)
+            toggle = now + (on - phase if lit else on + off - phase)
+            if end is not None:
+                toggle = min(toggle, end)
+            deadline = toggle if deadline is None else min(deadline, toggle)
+        return value, deadline
+
+    def _run(self):
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0, deadline - time.time())
+            try:
+                self._apply(self.commands.get(timeout=timeout), time.time())
+            except queue.Empty:
+                pass
+
+            # Fold every command that arrives before the next allowed write into that write
+            while True:
+                remaining = self.last_write_time + self.TICK - time.time()
+                try:
+                    command = self.commands.get(timeout=remaining) if remaining > 0 else self.commands.get_nowait()
+                except queue.Empty:
+                    if remaining > 0:
+                        continue
+                    break
+                self._apply(command, time.time())
+
+            now = time.time()
+            value, deadline = self._output(now)
+            if value != self.current:
+                try:
+                    self.bus.write_byte_data(self.address, self.register, value)
+                    self.current = value
+                except Exception as e:
+                    print(f"Error setting LED state: {e}")
+                self.last_write_time = now
+
 class ButtonsLEDController:
-    def __init__(self, volumioIO, debounce_delay=0.1):
+    COLUMN_SETTLE = 0.001  # Seconds for the rows to settle after driving a column
+    IDLE_POLL_INTERVAL = 0.05  # Polling fallback while nothing has happened recently
+    ACTIVE_POLL_INTERVAL = 0.02  # Polling while a button is held or was just used
+    ACTIVE_PERIOD = 1.0  # Seconds after the last change that polling stays fast
+    INT_SAFETY_TIMEOUT = 1.0  # Re-check the rows this often in case an INT edge was missed
+    ACK_TIMEOUT = 2.0  # Seconds a Socket.IO command may wait for the pushState that confirms it
+
+    def __init__(self, volumioIO, debounce_delay=0.1, state_store=None, int_pin=None):
         self.bus = smbus.SMBus(1)
         self.debounce_delay = debounce_delay
+        self.int_pin = int_pin  # Pi GPIO (BCM) wired to the MCP23017 INTB/INTA line, if any
+        self.int_event = threading.Event()
         self.prev_button_state = [[1, 1], [1, 1], [1, 1], [1, 1]]
+        self.last_change_time = [[0, 0], [0, 0], [0, 0], [0, 0]]
         self.button_map = [[1, 2], [3, 4], [5, 6], [7, 8]]
+        self.pending_acks = []  # Commands sent over Socket.IO and not yet confirmed by a pushState
+        self.ack_condition = threading.Condition()
+        threading.Thread(target=self._ack_timeout_loop, daemon=True).start()
         self.volumioIO = volumioIO
-        self.status_led_state = 0
-        self.other_button_led_state = 0
-        self.current_led_state = 0
+        self.state_store = state_store
         self._initialize_mcp23017()
+        self.leds = LEDDriver(self.bus)  # Sole writer of the LED register
         self.register_volumio_callbacks()
 
     def _initialize_mcp23017(self):
@@ -45,9 +187,38 @@ class ButtonsLEDController:
         self.bus.write_byte_data(MCP23017_ADDRESS, MCP23017_GPPUB, 0x3C)
         self.bus.write_byte_data(MCP23017_ADDRESS, MCP23017_IODIRA, 0x00)
         self.bus.write_byte_data(MCP23017_ADDRESS, MCP23017_GPIOA, 0x00)
+        # Drive both columns low while idle so any press pulls its row low
+        self.bus.write_byte_data(MCP23017_ADDRESS, MCP23017_GPIOB, 0x00)
+        if self.int_pin is not None:
+            self._initialize_interrupts()
+
+    def _initialize_interrupts(self):
+        """Raises INT on any row change and wakes the scan loop through a Pi GPIO edge."""
+        try:
+            # MIRROR (either INT pin reports both ports) and ODR (open-drain, pulled up on the Pi side)
+            self.bus.write_byte_data(MCP23017_ADDRESS, MCP23017_IOCON, 0x44)
+            self.bus.write_byte_data(MCP23017_ADDRESS, MCP23017_INTCONB, 0x00)  # Compare with previous value
+            self.bus.write_byte_data(MCP23017_ADDRESS, MCP23017_GPINTENB, ROW_MASK)
+            self.bus.read_byte_data(MCP23017_ADDRESS, MCP23017_INTCAPB)  # Clear anything pending
+
+            GPIO.setmode(GPIO.BCM)
+            GPIO.setup(self.int_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+            try:
+                GPIO.remove_event_detect(self.int_pin)
+            except RuntimeError:
+                pass
+            GPIO.add_event_detect(self.int_pin, GPIO.FALLING, callback=lambda channel: self.int_event.set())
+            print(f"Button matrix interrupts enabled on GPIO {self.int_pin}.")
+        except Exception as e:
+            print(f"Could not enable button matrix interrupts ({e}); falling back to polling.")
+            self.int_pin = None
 
     def register_volumio_callbacks(self):
-        self.volumioIO.on('pushState', self.on_state)
+        if self.state_store:
+            self.state_store.subscribe(self.on_state_fields_changed, fields=("status",))
+            self.state_store.subscribe(self.check_command_acks, fields=ACK_FIELDS)
+        else:
+            self.volumioIO.on('pushState', self.on_state)
         self.volumioIO.on('connect', self.on_connect)
         self.volumioIO.on('disconnect', self.on_disconnect)
 
@@ -62,19 +233,24 @@ class ButtonsLEDController:
         if new_status:
             print(f"Volumio status: {new_status.upper()}")
         self.update_status_leds(new_status)
+        if not self.state_store:
+            self.check_command_acks(state)
+
+    def on_state_fields_changed(self, state, changes):
+        """StateStore subscriber for the 'status' field."""
+        self.on_state(state)
 
     def start_status_update_loop(self):
         """Periodically fetch and update Volumio's status in a loop."""
         while True:
-            try:
-                response = requests.get("http://localhost:3000/api/v1/getState")
-                if response.status_code == 200:
-                    state = response.json().get("status")
-                    self.update_status_leds(state)
-                else:
-                    print(f"Failed to fetch Volumio state. Status code: {response.status_code}")
-            except Exception as e:
-                print(f"Error fetching Volumio state: {e}")
+            if self.state_store:
+                # The shared store is kept current by pushState; no HTTP round trip needed
+                self.update_status_leds(self.state_store.get("status"))
+                time.sleep(5)
+                continue
+            state = get_client().get_state()
+            if state:
+                self.update_status_leds(state.get("status"))
             time.sleep(5)  # Update interval
 
     def read_button_matrix(self):
@@ -82,24 +258,69 @@ class ButtonsLEDController:
         for column in range(2):
             column_mask = ~(1 << column) & 0x03
             self.bus.write_byte_data(MCP23017_ADDRESS, MCP23017_GPIOB, column_mask)
-            time.sleep(0.005)
-            row_state = self.bus.read_byte_data(MCP23017_ADDRESS, MCP23017_GPIOB) & 0x3C
+            time.sleep(self.COLUMN_SETTLE)
+            row_state = self.bus.read_byte_data(MCP23017_ADDRESS, MCP23017_GPIOB) & ROW_MASK
             for row in range(4):
                 button_matrix_state[row][column] = (row_state >> (row + 2)) & 1
+        # Back to both columns low for the idle check and interrupts
+        self.bus.write_byte_data(MCP23017_ADDRESS, MCP23017_GPIOB, 0x00)
         return button_matrix_state
 
+    def read_rows(self):
+        """Single-read idle check (columns low): ROW_MASK when no button is down. Also clears INT."""
+        return self.bus.read_byte_data(MCP23017_ADDRESS, MCP23017_GPIOB) & ROW_MASK
+
+    def buttons_active(self):
+        """True while a row reads low or a press has not been seen released yet."""
+        return self.read_rows() != ROW_MASK or any(0 in row for row in self.prev_button_state)
+
+    def scan_buttons(self):
+        """Scans the matrix and dispatches new presses."""
+        button_matrix = self.read_button_matrix()
+        now = time.time()
+        for row in range(4):
+            for col in range(2):
+                current_button_state = button_matrix[row][col]
+                if current_button_state == self.prev_button_state[row][col]:
+                    continue
+                if now - self.last_change_time[row][col] < self.debounce_delay:
+                    continue  # Contact bounce
+                self.last_change_time[row][col] = now
+                self.prev_button_state[row][col] = current_button_state
+                if current_button_state == 0:
+                    button_id = self.button_map[row][col]
+                    print(f"Button {button_id} pressed")
+                    self.handle_button_press(button_id)
+
     def check_buttons_and_update_leds(self):
+        if self.int_pin is not None:
+            self._interrupt_scan_loop()
+        else:
+            self._polling_scan_loop()
+
+    def _interrupt_scan_loop(self):
+        """Sleeps until the MCP23017 signals a row change, then scans until every button is released."""
         while True:
-            button_matrix = self.read_button_matrix()
-            for row in range(4):
-                for col in range(2):
-                    button_id = self.button_map[row][col]
-                    current_button_state = button_matrix[row][col]
-                    if current_button_state == 0 and self.prev_button_state[row][col] != current_button_state:
-                        print(f"Button {button_id} pressed")
-                        self.handle_button_press(button_id)
-                    self.prev_button_state[row][col] = current_button_state
-            time.sleep(self.debounce_delay)
+            if self.int_event.wait(self.INT_SAFETY_TIMEOUT):
+                self.int_event.clear()
+                self.bus.read_byte_data(MCP23017_ADDRESS, MCP23017_INTCAPB)  # Releases INT
+                self.scan_buttons()  # Scan at least once so a quick tap is not lost
+            # Reading the rows also clears any change raised by our own column scanning; a press that
+            # lands after the last scan is still seen here because its row reads low
+            while self.buttons_active():
+                # Held buttons on a shared row do not raise INT, so poll until all are released
+                self.scan_buttons()
+                time.sleep(self.ACTIVE_POLL_INTERVAL)
+
+    def _polling_scan_loop(self):
+        """Fallback without an INT line: one I2C read per idle poll, faster polling around activity."""
+        last_activity = 0
+        while True:
+            if self.buttons_active():
+                self.scan_buttons()
+                last_activity = time.time()
+            active = time.time() - last_activity < self.ACTIVE_PERIOD
+            time.sleep(self.ACTIVE_POLL_INTERVAL if active else self.IDLE_POLL_INTERVAL)
 
     def handle_button_press(self, button_id):
         led_to_flash = None
@@ -129,40 +350,101 @@ class ButtonsLEDController:
             led_to_flash = LED.LED8
         if led_to_flash:
             print(f"LED lit for button {button_id}: {led_to_flash.name}")
-            threading.Thread(target=self.flash_led, args=(led_to_flash.value,)).start()
+            self.flash_led(led_to_flash.value)
 
     def flash_led(self, led_value, duration=0.2):
-        try:
-            self.other_button_led_state |= led_value
-            self.control_leds()
-            time.sleep(duration)
-            self.other_button_led_state &= ~led_value
-            self.control_leds()
-        except Exception as e:
-            print(f"Error flashing LED: {e}")
-
-    def control_leds(self):
-        total_state = self.status_led_state | self.other_button_led_state
-        if total_state != self.current_led_state:
-            try:
-                self.bus.write_byte_data(MCP23017_ADDRESS, MCP23017_GPIOA, total_state)
-                self.current_led_state = total_state
-            except Exception as e:
-                print(f"Error setting LED state: {e}")
+        self.leds.flash(led_value, duration)
 
     def update_status_leds(self, new_status):
         if new_status == "play":
-            self.status_led_state = LED.LED1.value  # Play LED on
-            self.status_led_state &= ~LED.LED2.value  # Ensure Pause LED is off
+            status_led_state = LED.LED1.value  # Play LED on, Pause LED off
         elif new_status in ["pause", "stop"]:  # Handle both pause and stop the same way
-            self.status_led_state = LED.LED2.value  # Pause/Stop LED on
-            self.status_led_state &= ~LED.LED1.value  # Ensure Play LED is off
+            status_led_state = LED.LED2.value  # Pause/Stop LED on, Play LED off
         else:
-            self.status_led_state = 0  # Clear all status LEDs for any other state
-        self.control_leds()
+            status_led_state = 0  # Clear all status LEDs for any other state
+        # Both status LEDs change in the same write; unchanged states cost no I2C traffic
+        self.leds.assign(STATUS_LEDS, status_led_state)
 
 
     def execute_volumio_command(self, command):
+        """Sends a transport command over the open Socket.IO connection, or via the CLI as a fallback."""
+        if not self.emit_transport_command(command):
+            self.run_cli_command(command)
+
+    def emit_transport_command(self, command):
+        """Emits `command` and waits for its pushState in the background. Returns False if it was not sent."""
+        spec = TRANSPORT_COMMANDS.get(command)
+        if not spec or not self.volumioIO or not getattr(self.volumioIO, "connected", True):
+            return False
+        event, toggled_field = spec
+        state = self.state_store.get_state() if self.state_store else {}
+
+        payload = None
+        if toggled_field:
+            if toggled_field not in state:
+                return False  # Unknown current value; let the CLI toggle it
+            value = not state.get(toggled_field)
+            payload = {"value": value}
+            expect = lambda s: s.get(toggled_field) == value
+        elif command == "play":
+            expect = lambda s: s.get("status") == "play"
+        elif command == "pause":
+            expect = lambda s: s.get("status") in ("pause", "stop")  # Webradio stops instead of pausing
+        else:
+            expect = lambda s: True  # next/previous: any following pushState
+
+        # Already in that state: Volumio will not push a change to confirm it
+        ack = None if command in ("play", "pause") and state and expect(state) else (command, expect, time.time())
+        if ack:
+            # Registered before the emit so a pushState that beats emit() back still confirms it
+            with self.ack_condition:
+                self.pending_acks.append(ack)
+                self.ack_condition.notify()
+
+        sent = self.volumioIO.emit(event) if payload is None else self.volumioIO.emit(event, payload)
+        if not sent:
+            if ack:
+                with self.ack_condition:
+                    self.pending_acks = [pending for pending in self.pending_acks if pending is not ack]
+            return False
+        return True
+
+    def check_command_acks(self, state, changes=None):
+        """pushState handler: confirms pending Socket.IO commands that this state satisfies."""
+        if not self.pending_acks:
+            return
+        now = time.time()
+        with self.ack_condition:
+            pending = []
+            for command, expect, sent_at in self.pending_acks:
+                if expect(state):
+                    print(f"Volumio acknowledged '{command}' in {(now - sent_at) * 1000:.0f} ms")
+                else:
+                    pending.append((command, expect, sent_at))
+            self.pending_acks = pending
+
+    def _ack_timeout_loop(self):
+        while True:
+            with self.ack_condition:
+                while not self.pending_acks:
+                    self.ack_condition.wait()
+                oldest = min(sent_at for _, _, sent_at in self.pending_acks)
+                wait = oldest + self.ACK_TIMEOUT - time.time()
+                if wait > 0:
+                    self.ack_condition.wait(wait)
+                    continue
+                now = time.time()
+                expired = [command for command, _, sent_at in self.pending_acks if now - sent_at >= self.ACK_TIMEOUT]
+                self.pending_acks = [ack for ack in self.pending_acks if now - ack[2] < self.ACK_TIMEOUT]
+
+            for command in expired:
+                if command in IDEMPOTENT_COMMANDS:
+                    print(f"No pushState confirmed '{command}'; retrying through the CLI.")
+                    self.run_cli_command(command)
+                else:
+                    print(f"No pushState confirmed '{command}'; not retrying a non-idempotent command.")
+
+    def run_cli_command(self, command):
         cmd = f"volumio {command}"
         try:
             result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
@@ -1,18 +1,19 @@
 import time
 import threading
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
+from glyph_atlas import get_glyph_atlas
+from resources import get_font, DSEG7, OPEN_SANS
 
 class Clock:
     def __init__(self, device):
         # Load fonts for the clock display
-        font_path = "/home/volumio/Quadify/DSEG7Classic-Light.ttf"
-        alt_font_path = "/home/volumio/Quadify/OpenSans-Regular.ttf"
         try:
-            self.clock_large_font = ImageFont.truetype(font_path, 35)
-            self.clock_small_font = ImageFont.truetype(alt_font_path, 12)
+            self.clock_large_font = get_font(DSEG7, 35)
+            self.clock_small_font = get_font(OPEN_SANS, 12)
         except IOError:
             print("Font file not found. Please check the font paths.")
             exit()
+        self.clock_digits = get_glyph_atlas(self.clock_large_font)  # Pre-rendered DSEG7 digits
 
         # Use the passed device instead of initializing a new one
         self.device = device
@@ -20,18 +21,18 @@ class Clock:
 
         self.running = False
         self.update_thread = None
+        self.stop_event = threading.Event()  # Wakes the update thread early on stop() or redraw()
 
     def draw_clock(self):
         """Draw the current time on the OLED screen."""
         # Create a blank image to draw on
         image = Image.new(self.device.mode, (self.device.width, self.device.height), "black")
-        draw = ImageDraw.Draw(image)
 
         # Get the current time in HH:MM format
         current_time = time.strftime("%H:%M")
         
         # Draw the time in the center of the screen
-        draw.text((self.device.width / 2, self.device.height / 2.5), current_time, font=self.clock_large_font, fill="white", anchor="mm")
+        self.clock_digits.draw_text(image, (self.device.width / 2, self.device.height / 2.5), current_time, fill="white", anchor="mm")
 
         # Display the image on the device
         self.device.display(image)
@@ -40,6 +41,7 @@ class Clock:
         """Start the clock display."""
         if not self.running:
             self.running = True
+            self.stop_event.clear()
             self.update_thread = threading.Thread(target=self.update_clock)
             self.update_thread.start()
             print("Clock mode started.")
@@ -48,16 +50,26 @@ class Clock:
         """Stop the clock display cleanly."""
         if self.running:
             self.running = False
+            self.stop_event.set()
             if self.update_thread:
                 self.update_thread.join()
             self.draw_black_screen()  # Clear the screen before stopping
             print("Clock mode stopped and screen cleared.")
 
+    def redraw(self):
+        """Repaints the running clock straight away, e.g. after something else cleared the screen."""
+        if self.running:
+            self.stop_event.set()
+
     def update_clock(self):
-        """Update the clock continuously while running."""
+        """Redraw the clock once per minute, waking just after each minute boundary."""
+        # The event is cleared only after a wait, so a stop() racing the loop is never lost;
+        # start() clears it before the thread runs
         while self.running:
             self.draw_clock()
-            time.sleep(1)  # Update every 1 second to keep the time accurate
+            now = time.time()
+            self.stop_event.wait(60 - now % 60 + 0.05)
+            self.stop_event.clear()
 
     def draw_black_screen(self):
         """Clear the screen by drawing a black image."""
@@ -0,0 +1,76 @@
+import threading
+from PIL import Image
+from frame_recorder import FrameRecorder, to_levels, levels_to_image
+
+class HeadlessDevice:
+    """
+    In-memory stand-in for the 256x64 SSD1322, for running and timing the screens off a Pi.
+
+    It exposes the same mode, width, height, display() and clear() as the luma device. The last frame
+    shown is kept as `image`, quantised to the panel's 16 grey levels, and every frame can be written to
+    a FrameRecorder.
+    """
+
+    def __init__(self, width=256, height=64, mode="RGB", recorder=None):
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.size = (width, height)
+        self.recorder = recorder
+        self.image = Image.new("L", self.size, 0)
+        self.frames_displayed = 0
+        self.lock = threading.Lock()
+
+    def display(self, image):
+        if image.size != self.size:
+            raise ValueError(f"Frame size {image.size} does not match the display size {self.size}")
+        # Keep what the panel would show: the 4-bit levels luma would send
+        grey = levels_to_image(to_levels(image), self.size)
+        with self.lock:
+            self.image = grey
+            self.frames_displayed += 1
+        if self.recorder:
+            self.recorder.record(image)
+
+    def clear(self):
+        self.display(Image.new(self.mode, self.size, "black"))
+
+    def get_frame(self):
+        """A copy of the frame currently 'on the panel' (8-bit greyscale, 16 levels)."""
+        with self.lock:
+            return self.image.copy()
+
+    def contrast(self, level):
+        pass
+
+    def show(self):
+        pass
+
+    def hide(self):
+        pass
+
+    def cleanup(self):
+        if self.recorder:
+            self.recorder.close()
+
+def create_device(backend="ssd1322", record_path=None):
+    """
+    Opens the display backend: "ssd1322" for the panel on SPI, or "headless" for an in-memory device.
+    With `record_path`, a headless device writes every frame it is shown to that file.
+    """
+    if backend == "headless":
+        recorder = None
+        if record_path:
+            recorder = FrameRecorder(record_path, (256, 64))
+        print("Using the headless display backend.")
+        return HeadlessDevice(recorder=recorder)
+    if backend != "ssd1322":
+        raise ValueError(f"Unknown display backend '{backend}'")
+    if record_path:
+        print("Frame recording is only available on the headless backend; ignoring it.")
+
+    # Imported here so the other backends work without luma and SPI
+    from luma.core.interface.serial import spi
+    from luma.oled.device import ssd1322
+    serial = spi(device=0, port=0)
+    return ssd1322(serial, rotate=2)
@@ -0,0 +1,235 @@
+import inspect
+import threading
+from PIL import Image, ImageChops
+from frame_recorder import to_levels
+
+# The luma.oled release the windowed writes were checked against (pinned in install.sh)
+LUMA_OLED_VERSION = "3.13.0"
+
+# Lookup table moving a 4-bit level into the high nibble of a packed byte
+_HIGH_NIBBLE = bytes((v << 4) & 0xF0 for v in range(256))
+
+class DisplayCompositor:
+    """
+    Sits between the screens and the luma device and only transmits the parts of a frame that changed.
+
+    Each frame is diffed against the last one sent. The changed rows are grouped into bands and each
+    band's bounding box is written through the SSD1322 column/row window, so a clock tick or a menu
+    scroll only sends a few hundred bytes over SPI instead of the whole 8 KB framebuffer.
+
+    Frames that are byte-identical to the previous one are dropped before any diffing; the
+    frames_rendered / frames_sent counters show how many frames the screens produced vs. transmitted.
+
+    Screens use it exactly like the luma device: it exposes mode, width, height, display() and clear(),
+    and forwards anything else to the wrapped device.
+
+    Windowed writes go through luma's private _set_position(), so they are only used if that still has
+    the expected signature and one test frame packed here matches what device.display() sends for it.
+    Otherwise every changed frame is handed to device.display() whole.
+    """
+    BAND_HEIGHT = 8  # Rows per damage band
+    COLUMN_ALIGN = 4  # SSD1322 column addresses cover 4 pixels
+    MERGE_SLACK = 1.25  # Merge adjacent bands if the union is at most this much larger than both
+
+    def __init__(self, device):
+        self.device = device
+        self.mode = device.mode
+        self.width = device.width
+        self.height = device.height
+        self.size = (self.width, self.height)
+        self.last_frame = None  # Last frame sent, in device orientation as 8-bit greyscale
+        self.last_image_bytes = None  # Raw bytes of the last frame submitted, for the identity check
+        self.lock = threading.Lock()
+
+        # Frame counters
+        self.frames_rendered = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+
+        # Windowed writes need luma's greyscale device helpers; anything else gets whole frames
+        self.partial_updates = self._check_partial_updates()
+
+    def __getattr__(self, name):
+        return getattr(self.device, name)
+
+    def clear(self):
+        self.display(Image.new(self.mode, self.size, "black"))
+
+    def display(self, image):
+        if image.mode != self.mode:
+            image = image.convert(self.mode)
+
+        with self.lock:
+            self.frames_rendered += 1
+            image_bytes = image.tobytes()
+            if image_bytes == self.last_image_bytes:
+                return  # Identical frame; nothing to send
+            self.last_image_bytes = image_bytes
+
+            if not self.partial_updates:
+                self.device.display(image)
+                self.frames_sent += 1
+                return
+
+            frame = self.device.preprocess(image)
+            if frame.mode == "1":
+                frame = frame.convert("L")  # ImageChops cannot diff 1-bit images
+            boxes = self.get_damage(frame)
+            for box in boxes:
+                self.bytes_sent += self._write_region(frame, box)
+            if boxes:
+                self.frames_sent += 1
+            self.last_frame = frame
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "frames_rendered": self.frames_rendered,
+                "frames_sent": self.frames_sent,
+                "frames_skipped": self.frames_rendered - self.frames_sent,
+                "bytes_sent": self.bytes_sent,
+            }
+
+    def invalidate(self):
+        """Forces the next frame to be sent in full (e.g. after the panel was reset)."""
+        with self.lock:
+            self.last_frame = None
+            self.last_image_bytes = None
+
+    def get_damage(self, frame):
+        """Returns the (left, top, right, bottom) boxes that differ from the last frame sent."""
+        width, height = frame.size
+        if self.last_frame is None or self.last_frame.size != frame.size:
+            return [(0, 0, width, height)]
+
+        diff = ImageChops.difference(frame, self.last_frame)
+        if diff.getbbox() is None:
+            return []
+
+        boxes = []
+        for band_top in range(0, height, self.BAND_HEIGHT):
+            band_bottom = min(band_top + self.BAND_HEIGHT, height)
+            bbox = diff.crop((0, band_top, width, band_bottom)).getbbox()
+            if not bbox:
+                continue
+
+            left = bbox[0] - bbox[0] % self.COLUMN_ALIGN
+            right = min(width, -(-bbox[2] // self.COLUMN_ALIGN) * self.COLUMN_ALIGN)
+            box = (left, band_top + bbox[1], right, band_top + bbox[3])
+
+            if boxes and boxes[-1][3] == box[1]:
+                merged = self._merge(boxes[-1], box)
+                if self._area(merged) <= (self._area(boxes[-1]) + self._area(box)) * self.MERGE_SLACK:
+                    boxes[-1] = merged
+                    continue
+            boxes.append(box)
+        return boxes
+
+    @staticmethod
+    def _merge(a, b):
+        return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+    @staticmethod
+    def _area(box):
+        return (box[2] - box[0]) * (box[3] - box[1])
+
+    def _write_region(self, frame, box):
+        """Packs one region to 4 bpp and writes it to its RAM window. Returns the bytes sent."""
+        left, top, right, bottom = box
+        packed = self._pack(frame.crop(box))
+        self.device._set_position(top, right, bottom, left)
+        self.device.data(list(packed))
+        return len(packed)
+
+    @staticmethod
+    def _pack(region):
+        """Packs a region to 4 bpp, left pixel in the high nibble, with luma's grey levels."""
+        levels = to_levels(region)
+        high = levels[0::2].translate(_HIGH_NIBBLE)
+        low = levels[1::2]
+        return (int.from_bytes(high, "big") | int.from_bytes(low, "big")).to_bytes(len(high), "big")
+
+    def _check_partial_updates(self):
+        device = self.device
+        if not (hasattr(device, "_set_position") and hasattr(device, "preprocess") and hasattr(device, "data")):
+            return False
+
+        try:
+            import luma.oled
+            version = getattr(luma.oled, "__version__", "unknown")
+        except ImportError:
+            version = "unknown"
+        if version != LUMA_OLED_VERSION:
+            print(f"[DisplayCompositor] luma.oled {version} is not the checked {LUMA_OLED_VERSION}; verifying it.")
+
+        try:
+            parameters = list(inspect.signature(device._set_position).parameters)
+        except (TypeError, ValueError):
+            parameters = None
+        if parameters != ["top", "right", "bottom", "left"]:
+            print(f"[DisplayCompositor] luma _set_position{parameters} is not (top, right, bottom, left); "
+                  "sending whole frames.")
+            return False
+
+        try:
+            matches = self._compare_test_frame()
+        except Exception as e:
+            print(f"[DisplayCompositor] Windowed write check failed ({e}); sending whole frames.")
+            return False
+        if not matches:
+            print("[DisplayCompositor] Windowed writes differ from device.display(); sending whole frames.")
+        return matches
+
+    def _compare_test_frame(self):
+        """
+        Sends one test frame through device.display() and through _write_region() with the device's
+        writes captured instead of sent, and compares the panel RAM each would leave behind.
+        """
+        width, height = self.size
+        # Every pixel differs from its neighbours and from black, so luma sends the whole frame
+        vertical = Image.linear_gradient("L").resize(self.size)
+        horizontal = Image.linear_gradient("L").rotate(90).resize(self.size)
+        test_image = Image.merge("RGB", (vertical, horizontal, Image.new("L", self.size, 255))).convert(self.mode)
+
+        luma_ram = self._capture_writes(lambda: self.device.display(test_image))
+        frame = self.device.preprocess(test_image)
+        if frame.mode == "1":
+            frame = frame.convert("L")
+        own_ram = self._capture_writes(lambda: self._write_region(frame, (0, 0, width, height)))
+
+        # Leave luma's own frame buffer blank, as the panel is after initialisation
+        self._capture_writes(lambda: self.device.display(Image.new(self.mode, self.size, "black")))
+        return luma_ram is not None and luma_ram == own_ram
+
+    def _capture_writes(self, send):
+        """Runs `send` with _set_position()/data() captured into an emulated RAM (None if nothing was written)."""
+        width, height = self.size
+        ram = bytearray(width * height)
+        window = []
+        written = []
+
+        def set_position(top, right, bottom, left):
+            window[:] = [left, top, right, bottom]
+
+        def data(values):
+            left, top, right, bottom = window
+            values = bytes(values)
+            if len(values) * 2 != (right - left) * (bottom - top):
+                raise ValueError(f"{len(values)} bytes do not fill window {tuple(window)}")
+            unpacked = bytearray(len(values) * 2)
+            unpacked[0::2] = bytes(v >> 4 for v in values)
+            unpacked[1::2] = bytes(v & 0x0F for v in values)
+            row = right - left
+            for y in range(top, bottom):
+                start = (y - top) * row
+                ram[y * width + left:y * width + right] = unpacked[start:start + row]
+            written.append(len(values))
+
+        self.device._set_position = set_position
+        self.device.data = data
+        try:
+            send()
+        finally:
+            del self.device._set_position
+            del self.device.data
+        return bytes(ram) if written else None
@@ -0,0 +1,253 @@
+import os
+import re
+import csv
+import bisect
+import time
+import queue
+import struct
+import argparse
+import threading
+from PIL import Image
+
+# File layout (little endian):
+#   header: b"QFR1", width (u16), height (u16), recording start as a Unix time (f64)
+#   frame:  seconds since start (f64), payload length (u32), payload
+# A payload is the frame's 4-bit grey levels, run-length encoded one run per byte: the level in the
+# high nibble and the run length (1-15) in the low nibble; a low nibble of 0 means the run length
+# follows as a u16. An empty payload repeats the previous frame.
+MAGIC = b"QFR1"
+HEADER = struct.Struct("<4sHHd")
+FRAME = struct.Struct("<dI")
+RUN_LENGTH = struct.Struct("<H")
+
+_TO_LEVEL = bytes(v >> 4 for v in range(256))  # 8-bit grey -> SSD1322 4-bit level, as luma packs it
+_TO_GREY = bytes(min(v, 15) * 17 for v in range(256))  # 4-bit level -> 8-bit grey for viewing
+_RUNS = re.compile(rb"(.)\1*", re.S)
+
+# luma.oled's greyscale devices weigh RGB as (306 R + 601 G + 117 B) >> 14, which does not always
+# agree with Pillow's convert("L") followed by >> 4
+_RED = [v * 306 for v in range(256)]
+_GREEN = [v * 601 for v in range(256)]
+_BLUE = [v * 117 for v in range(256)]
+
+def to_levels(image):
+    """The 4-bit grey levels (one per byte) the SSD1322 would show for `image`."""
+    if image.mode in ("1", "L"):
+        return image.convert("L").tobytes().translate(_TO_LEVEL)
+    data = image.convert("RGB").tobytes()
+    return bytes((_RED[r] + _GREEN[g] + _BLUE[b]) >> 14 for r, g, b in zip(data[0::3], data[1::3], data[2::3]))
+
+def levels_to_image(levels, size):
+    """An 8-bit greyscale image of 4-bit levels, for viewing (level 15 -> 255)."""
+    return Image.frombytes("L", size, levels.translate(_TO_GREY))
+
+def encode_levels(levels):
+    out = bytearray()
+    for match in _RUNS.finditer(levels):
+        level = match.group()[0] << 4
+        length = match.end() - match.start()
+        while length:
+            run = min(length, 0xFFFF)
+            if run < 16:
+                out.append(level | run)
+            else:
+                out.append(level)
+                out += RUN_LENGTH.pack(run)
+            length -= run
+    return bytes(out)
+
+def decode_levels(payload):
+    out = bytearray()
+    i = 0
+    while i < len(payload):
+        level, run = payload[i] >> 4, payload[i] & 0x0F
+        i += 1
+        if not run:
+            run, = RUN_LENGTH.unpack_from(payload, i)
+            i += RUN_LENGTH.size
+        out += bytes((level,)) * run
+    return bytes(out)
+
+class FrameRecorder:
+    """
+    Appends frames to a recording file with the time each one was displayed.
+
+    record() only converts the frame to 4-bit levels and queues it; encoding and file I/O happen on a
+    writer thread so recording does not slow down the screen that is being measured.
+    """
+
+    def __init__(self, path, size=(256, 64)):
+        self.path = path
+        self.size = size
+        self.start_time = time.time()
+        self.frames = queue.SimpleQueue()
+        self.frame_count = 0
+        self.bytes_written = 0
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, size[0], size[1], self.start_time))
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def record(self, image, timestamp=None):
+        if image.size != self.size:
+            raise ValueError(f"Frame size {image.size} does not match the recording size {self.size}")
+        self.frames.put((timestamp or time.time(), to_levels(image)))
+
+    def _write_loop(self):
+        previous = None
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            timestamp, levels = item
+            payload = b"" if levels == previous else encode_levels(levels)
+            previous = levels
+            self.file.write(FRAME.pack(timestamp - self.start_time, len(payload)))
+            self.file.write(payload)
+            self.frame_count += 1
+            self.bytes_written += FRAME.size + len(payload)
+        self.file.close()
+
+    def close(self):
+        """Writes out every queued frame and closes the file."""
+        if self.writer.is_alive():
+            self.frames.put(None)
+            self.writer.join()
+        print(f"[FrameRecorder] Wrote {self.frame_count} frames ({self.bytes_written} bytes) to {self.path}")
+
+class FrameReader:
+    """Iterates a recording as (seconds since start, levels) pairs."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, width, height, self.start_time = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a frame recording")
+        self.size = (width, height)
+
+    def __iter__(self):
+        previous = bytes(self.size[0] * self.size[1])
+        with open(self.path, "rb") as f:
+            f.seek(HEADER.size)
+            while True:
+                header = f.read(FRAME.size)
+                if len(header) < FRAME.size:
+                    return  # End of file, or a frame cut short by a crash
+                offset, length = FRAME.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length:
+                    return
+                if payload:
+                    previous = decode_levels(payload)
+                yield offset, previous
+
+    def images(self):
+        for offset, levels in self:
+            yield offset, levels_to_image(levels, self.size)
+
+def inspect(path):
+    reader = FrameReader(path)
+    offsets = []
+    payload_bytes = 0
+    with open(path, "rb") as f:
+        f.seek(HEADER.size)
+        while True:
+            header = f.read(FRAME.size)
+            if len(header) < FRAME.size:
+                break
+            offset, length = FRAME.unpack(header)
+            f.seek(length, os.SEEK_CUR)
+            offsets.append(offset)
+            payload_bytes += length
+
+    print(f"{path}: {reader.size[0]}x{reader.size[1]}, recorded {time.ctime(reader.start_time)}")
+    if not offsets:
+        print("No frames.")
+        return
+    duration = offsets[-1] - offsets[0]
+    intervals = [b - a for a, b in zip(offsets, offsets[1:])]
+    raw_bytes = len(offsets) * reader.size[0] * reader.size[1] // 2  # Packed 4 bpp, as sent over SPI
+    print(f"Frames: {len(offsets)} over {duration:.2f}s ({len(offsets) / duration if duration else 0:.1f} fps)")
+    if intervals:
+        print(f"Frame interval: min {min(intervals) * 1000:.1f} ms, "
+              f"mean {sum(intervals) / len(intervals) * 1000:.1f} ms, max {max(intervals) * 1000:.1f} ms")
+    print(f"Payload: {payload_bytes} bytes, {payload_bytes / len(offsets):.0f} bytes/frame "
+          f"({raw_bytes / max(payload_bytes, 1):.0f}x smaller than packed frames)")
+
+def export(path, directory, scale=1):
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for count, (offset, image) in enumerate(FrameReader(path).images(), start=1):
+        if scale != 1:
+            image = image.resize((image.width * scale, image.height * scale), Image.NEAREST)
+        image.save(os.path.join(directory, f"frame_{count - 1:05d}_{offset * 1000:09.0f}ms.png"))
+    print(f"Exported {count} frames to {directory}")
+
+def latency(path, push_log, event="pushState"):
+    """
+    Push-to-pixel latency: for each push in `push_log` (a CSV written by mock_volumio.py --push-log), the
+    time until the next recorded frame. Pushes superseded by another push before any frame was shown were
+    coalesced by the renderer and are counted separately.
+    """
+    reader = FrameReader(path)
+    frame_times = [reader.start_time + offset for offset, _ in reader]
+    with open(push_log, newline="") as f:
+        push_times = sorted(float(row[0]) for row in csv.reader(f) if row and row[1] == event)
+
+    latencies = []
+    coalesced = 0
+    for i, pushed_at in enumerate(push_times):
+        frame = bisect.bisect_left(frame_times, pushed_at)
+        if frame == len(frame_times):
+            break
+        next_push = push_times[i + 1] if i + 1 < len(push_times) else None
+        if next_push is not None and next_push <= frame_times[frame]:
+            coalesced += 1
+            continue
+        latencies.append(frame_times[frame] - pushed_at)
+
+    print(f"{len(push_times)} '{event}' pushes, {len(latencies)} followed by a frame, {coalesced} coalesced")
+    if latencies:
+        latencies.sort()
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+        print(f"Push-to-pixel: min {latencies[0] * 1000:.1f} ms, median {percentile(0.5):.1f} ms, "
+              f"p95 {percentile(0.95):.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+
+def replay(path, device, speed=1.0):
+    """Shows a recording on `device` with its original timing (scaled by `speed`)."""
+    started = time.time()
+    for offset, image in FrameReader(path).images():
+        delay = started + offset / speed - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        device.display(image.convert(device.mode))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect, export or replay display frame recordings.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    inspect_parser = commands.add_parser("inspect", help="Print frame count, frame rate and sizes")
+    inspect_parser.add_argument("path")
+    export_parser = commands.add_parser("export", help="Write every frame as a PNG")
+    export_parser.add_argument("path")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--scale", type=int, default=1)
+    latency_parser = commands.add_parser("latency", help="Push-to-pixel latency against a mock_volumio.py push log")
+    latency_parser.add_argument("path")
+    latency_parser.add_argument("push_log")
+    latency_parser.add_argument("--event", default="pushState")
+    replay_parser = commands.add_parser("replay", help="Play a recording on a display")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--backend", default="ssd1322", choices=["ssd1322", "headless"])
+    replay_parser.add_argument("--speed", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.command == "inspect":
+        inspect(args.path)
+    elif args.command == "export":
+        export(args.path, args.directory, args.scale)
+    elif args.command == "latency":
+        latency(args.path, args.push_log, args.event)
+    else:
+        from display_backend import create_device
+        replay(args.path, create_device(args.backend), args.speed)
@@ -0,0 +1,200 @@
+import math
+import struct
+import threading
+from collections import OrderedDict
+import PIL
+from PIL import Image, ImageChops, ImageDraw
+
+def _pixel(value):
+    """FreeType 26.6 -> pixels, rounded the same way as Pillow's PIXEL() macro."""
+    return ((value + 32) & -64) >> 6
+
+def _f32(value):
+    """Rounds to single precision, matching the float arithmetic in Pillow's font_render."""
+    return struct.unpack("f", struct.pack("f", value))[0]
+
+def _trunc_div(a, b):
+    """C-style integer division (truncates toward zero)."""
+    q = abs(a) // abs(b)
+    return q if (a >= 0) == (b >= 0) else -q
+
+class _Glyph:
+    __slots__ = ("sprite", "offset", "ink_box")
+
+    def __init__(self, sprite, offset, ink_box):
+        self.sprite = sprite  # 8-bit coverage mask as rendered by FreeType
+        self.offset = offset  # Sprite top-left relative to the pen origin on the baseline (y down)
+        self.ink_box = ink_box  # (left, bottom, right, top) relative to the origin, y up; None if blank
+
+class GlyphAtlas:
+    """
+    Pre-rendered glyphs for one font size, composed into text by blitting.
+
+    Every glyph in `charset` is rasterised once. Drawing a string then lays the glyphs out with the
+    same 26.6 pen arithmetic, anchoring and clipping as ImageDraw.text, so the output is pixel-identical
+    while FreeType is never touched per frame. Only the characters and anchors the screens draw digits
+    with are served from the atlas; the atlas checks those against ImageDraw.text on start-up and falls
+    back to ImageDraw.text, with a log line, if the installed Pillow lays text out differently.
+    """
+    CHARSET = "0123456789:"  # Clock times and sample rates
+    ANCHORS = ("mm",)  # Both the clock and the playback sample rate are centred
+    CACHE_SIZE = 64  # Recently composed strings kept ready to paste
+
+    def __init__(self, font, charset=CHARSET, anchors=ANCHORS):
+        self.font = font
+        self.charset = charset
+        self.anchors = anchors
+        self.glyphs = {}
+        self.advances = {}  # (char, next_char or None) -> advance in 26.6, including kerning
+        self.y_anchors = {}
+        self.composed = OrderedDict()  # (text, anchor, fx, fy) -> (mask, offset)
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.logged_fallbacks = set()  # Reasons already logged by draw_text, so each is logged once
+
+        name = f"{getattr(font, 'path', font)} {getattr(font, 'size', '')}".strip()
+        try:
+            self._build()
+            mismatch = self._self_check()
+            self.enabled = mismatch is None
+            if mismatch:
+                print(f"[GlyphAtlas] {name}: atlas differs from ImageDraw.text on Pillow {PIL.__version__} "
+                      f"for {mismatch}; falling back to direct rendering.")
+        except Exception as e:
+            print(f"[GlyphAtlas] {name}: could not build atlas ({e}); falling back to direct rendering.")
+
+    def _build(self):
+        for char in self.charset:
+            sprite, offset = self.font.getmask2(char, "L", anchor="ls")
+            sprite = Image.frombytes("L", sprite.size, bytes(sprite))
+            bbox = sprite.getbbox()
+            ink_box = None
+            if bbox:
+                left, top, right, bottom = bbox
+                ink_box = (offset[0] + left, -(offset[1] + bottom), offset[0] + right, -(offset[1] + top))
+            self.glyphs[char] = _Glyph(sprite, offset, ink_box)
+
+        lengths = {char: round(self.font.getlength(char) * 64) for char in self.charset}
+        for char in self.charset:
+            self.advances[(char, None)] = lengths[char]
+            for next_char in self.charset:
+                pair = round(self.font.getlength(char + next_char) * 64)
+                self.advances[(char, next_char)] = pair - lengths[next_char]
+
+        # Fixed vertical anchors, measured relative to the baseline
+        sample = self.charset[0]
+        baseline = self.font.getbbox(sample, anchor="ls")[1]
+        for anchor in "amd":
+            self.y_anchors[anchor] = self.font.getbbox(sample, anchor="l" + anchor)[1] - baseline
+        self.y_anchors["s"] = 0
+
+    def _self_check(self):
+        """Compares the atlas with ImageDraw.text for the anchors in use. Returns the first mismatch, or None."""
+        samples = [self.charset, "12:34", "44", "0"]
+        size = getattr(self.font, "size", 32)
+        for text in samples:
+            length = math.ceil(self.font.getlength(text))
+            canvas = (length + 2 * size, 3 * size)
+            for anchor in self.anchors:
+                # Fractions the screens produce: centred on an odd width, and height / 2.5
+                for frac in ((0, 0), (0.5, 0), (0, 0.6), (0.5, 0.6)):
+                    xy = (canvas[0] // 2 + frac[0], canvas[1] // 2 + frac[1])
+                    expected = Image.new("L", canvas, 0)
+                    ImageDraw.Draw(expected).text(xy, text, font=self.font, fill=255, anchor=anchor)
+                    actual = Image.new("L", canvas, 0)
+                    self._paste(actual, xy, text, 255, anchor)
+                    if ImageChops.difference(expected, actual).getbbox():
+                        return f"'{text}' anchored '{anchor}' at {xy}"
+        self.composed.clear()
+        return None
+
+    def supports(self, text, anchor="la"):
+        return self.enabled and anchor in self.anchors and bool(text) and all(char in self.glyphs for char in text)
+
+    def draw_text(self, image, xy, text, fill="white", anchor="la"):
+        """Draws `text` onto `image` exactly like ImageDraw.Draw(image).text(xy, text, ...)."""
+        if not self.supports(text, anchor):
+            self._log_fallback(text, anchor)
+            ImageDraw.Draw(image).text(xy, text, font=self.font, fill=fill, anchor=anchor)
+            return
+        self._paste(image, xy, text, fill, anchor)
+
+    def _log_fallback(self, text, anchor):
+        if not self.enabled or not text:
+            return  # Disabled atlases were logged on start-up; empty text draws nothing
+        if anchor not in self.anchors:
+            reason = f"anchor '{anchor}'"
+        else:
+            reason = "characters " + "".join(sorted(set(text) - set(self.glyphs)))
+        if reason not in self.logged_fallbacks:
+            self.logged_fallbacks.add(reason)
+            print(f"[GlyphAtlas] No atlas for {reason}; drawing it with ImageDraw.text.")
+
+    def _paste(self, image, xy, text, fill, anchor):
+        fx = math.modf(xy[0])[0]
+        fy = math.modf(xy[1])[0]
+        key = (text, anchor, fx, fy)
+        with self.lock:
+            cached = self.composed.get(key)
+            if cached:
+                self.composed.move_to_end(key)
+            else:
+                cached = self._compose(text, anchor, fx, fy)
+                self.composed[key] = cached
+                if len(self.composed) > self.CACHE_SIZE:
+                    self.composed.popitem(last=False)
+        mask, offset = cached
+        image.paste(fill, (int(xy[0]) + offset[0], int(xy[1]) + offset[1]), mask)
+
+    def _compose(self, text, anchor, fx, fy):
+        """Builds the same (mask, offset) pair that font.getmask2(text, "L", anchor=..., start=...) returns."""
+        pens = []
+        position = x_min = x_max = y_min = y_max = 0
+        for i, char in enumerate(text):
+            next_char = text[i + 1] if i + 1 < len(text) else None
+            pen_x = _pixel(position)
+            pens.append(position)
+            position += self.advances[(char, next_char)]
+            x_max = max(x_max, _pixel(position))
+            ink_box = self.glyphs[char].ink_box
+            if ink_box:
+                x_min = min(x_min, ink_box[0] + pen_x)
+                x_max = max(x_max, ink_box[2] + pen_x)
+                y_min = min(y_min, ink_box[1])
+                y_max = max(y_max, ink_box[3])
+
+        x_anchor = {"l": 0, "m": _pixel(_trunc_div(position, 2)), "r": _pixel(position)}[anchor[0]]
+        if anchor[1] == "t":
+            y_anchor = y_max
+        elif anchor[1] == "b":
+            y_anchor = y_min
+        else:
+            y_anchor = self.y_anchors[anchor[1]]
+        offset = (x_min - x_anchor, y_anchor - y_max)
+
+        # getmask2 grows the mask by the fractional start so shifted glyphs are not clipped
+        mask = Image.new("L", (math.ceil(x_max - x_min + fx), math.ceil(y_max - y_min + fy)), 0)
+        origin_x = int(_f32(_f32(-x_min + _f32(fx)) * 64))
+        origin_y = int(_f32(_f32(-y_max - _f32(fy)) * 64))
+        baseline = -_pixel(origin_y)
+        for char, pen in zip(text, pens):
+            glyph = self.glyphs[char]
+            if not glyph.ink_box:
+                continue
+            left = _pixel(origin_x + pen) + glyph.offset[0]
+            top = baseline + glyph.offset[1]
+            box = (left, top, left + glyph.sprite.width, top + glyph.sprite.height)
+            mask.paste(ImageChops.lighter(mask.crop(box), glyph.sprite), box)
+        return mask, offset
+
+_atlases = {}
+_atlases_lock = threading.Lock()
+
+def get_glyph_atlas(font):
+    """Returns the shared atlas for a FreeType font, building it on first use."""
+    key = (getattr(font, "path", None), getattr(font, "size", None), getattr(font, "index", 0))
+    with _atlases_lock:
+        atlas = _atlases.get(key)
+        if atlas is None:
+            atlas = _atlases[key] = GlyphAtlas(font)
+        return atlas
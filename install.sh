@@ -102,7 +102,7 @@ install_python() {
 # ============================
 install_dependencies() {
     log_message "info" "Installing required Python libraries..."
-    pip3 install luma.oled Pillow requests socketIO-client-nexus
+    pip3 install luma.oled==3.13.0 Pillow requests socketIO-client-nexus
 }
 
 # ============================
@@ -0,0 +1,63 @@
+from PIL import Image, ImageDraw
+from text_cache import get_text_cache
+
+class ListView:
+    """
+    Scrolling text list shared by the menu screens.
+
+    Only the rows inside the visible window are drawn, and titles come from the shared TextCache, so
+    scrolling mostly pastes strips rasterised on earlier frames. Drawing a frame therefore costs the same
+    for a 5-item menu as for a 2,000-item listing.
+    """
+
+    def __init__(self, mode, size, font, rows, row_height=15, top=0, arrow_x=10, text_x=30,
+                 arrow="->", fill="gray", selected_fill="white", text_cache=None):
+        self.mode = mode
+        self.size = size
+        self.font = font
+        self.rows = rows  # Rows in the visible window
+        self.row_height = row_height
+        self.top = top
+        self.arrow_x = arrow_x
+        self.text_x = text_x
+        self.arrow = arrow
+        self.fill = fill
+        self.selected_fill = selected_fill
+        self.text_cache = text_cache or get_text_cache()
+
+    def window_start(self, selected, total):
+        """First visible index, keeping the selection centred where the list allows it."""
+        return max(0, min(selected - self.rows // 2, total - self.rows))
+
+    BADGE_WIDTH = 22  # Box at the right edge showing the letter while letter-jumping
+
+    def render(self, items, selected, title=None, badge=None):
+        """
+        Returns a new frame showing the window around `selected`. `items` is any sequence; `title(item)`
+        gives the text of an item (the item itself by default) and is only called for visible rows.
+        A `badge` (e.g. the current letter in letter-jump mode) is boxed at the right edge.
+        """
+        image = Image.new(self.mode, self.size, "black")
+        total = len(items)
+        start = self.window_start(selected, total)
+        for row, index in enumerate(range(start, min(start + self.rows, total))):
+            y = self.top + row * self.row_height
+            text = title(items[index]) if title else items[index]
+            if index == selected:
+                self.draw_text(image, (self.arrow_x, y), self.arrow, self.selected_fill)
+                self.draw_text(image, (self.text_x, y), text, self.selected_fill)
+            else:
+                self.draw_text(image, (self.text_x, y), text, self.fill)
+        if badge:
+            self.draw_badge(image, badge)
+        return image
+
+    def draw_badge(self, image, badge):
+        width, height = self.size
+        box = (width - self.BADGE_WIDTH, 0, width - 1, height - 1)
+        ImageDraw.Draw(image).rectangle(box, fill="black", outline=self.selected_fill)
+        center = ((box[0] + box[2]) // 2, height // 2)
+        self.text_cache.draw_text(image, center, badge, self.font, fill=self.selected_fill, anchor="mm")
+
+    def draw_text(self, image, xy, text, fill):
+        self.text_cache.draw_text(image, xy, text, self.font, fill=fill)
@@ -0,0 +1,91 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+class ListingCache:
+    """
+    Keeps browseLibrary listings by URI, persisted to one JSON file so they survive restarts.
+
+    Entries younger than `ttl` are fresh. Older ones are still returned so a menu can draw them straight
+    away while the listing is fetched again in the background (stale-while-revalidate).
+
+    put() only updates memory; the file is rewritten on a timer thread `save_delay` seconds after the
+    first unsaved change, so replies arriving on the Socket.IO thread never wait for disk I/O and a
+    burst of listings costs one write.
+    """
+
+    def __init__(self, path="/home/volumio/Quadify/cache/listings.json", ttl=600, max_entries=32, save_delay=2.0):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.save_delay = save_delay
+        self.entries = OrderedDict()  # uri -> {"fetched_at": ..., "items": [...]}, least recently used first
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.save_timer = None  # Pending background save, if any
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"[ListingCache] Ignoring unreadable cache file {self.path}: {e}")
+            return
+        for uri, entry in sorted(entries.items(), key=lambda item: item[1].get("fetched_at", 0)):
+            if isinstance(entry.get("items"), list):
+                self.entries[uri] = entry
+        print(f"[ListingCache] Loaded {len(self.entries)} cached listings.")
+
+    def get(self, uri):
+        """Returns (items, is_fresh), or (None, False) when the URI has never been fetched."""
+        with self.lock:
+            entry = self.entries.get(uri)
+            if not entry:
+                return None, False
+            self.entries.move_to_end(uri)
+            return entry["items"], time.time() - entry["fetched_at"] < self.ttl
+
+    def put(self, uri, items):
+        with self.lock:
+            self.entries[uri] = {"fetched_at": time.time(), "items": items}
+            self.entries.move_to_end(uri)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            if self.save_timer is None:
+                self.save_timer = threading.Timer(self.save_delay, self._save)
+                self.save_timer.daemon = True
+                self.save_timer.start()
+
+    def mark_stale(self):
+        """Keeps every listing but forces the next lookup of each to revalidate (e.g. after a reconnect)."""
+        with self.lock:
+            for entry in self.entries.values():
+                entry["fetched_at"] = 0
+
+    def flush(self):
+        """Writes any unsaved listings now (e.g. on shutdown)."""
+        with self.lock:
+            timer, self.save_timer = self.save_timer, None
+        if timer:
+            timer.cancel()
+            self._save()
+
+    def _save(self):
+        with self.lock:
+            self.save_timer = None
+            snapshot = {uri: dict(entry) for uri, entry in self.entries.items()}
+        # Write to a temporary file and rename, so a crash mid-write never leaves a truncated cache
+        with self.save_lock:
+            tmp_path = self.path + ".tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp_path, "w") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"[ListingCache] Could not save {self.path}: {e}")
@@ -1,76 +1,109 @@
+import os
 import time
 import threading
 import logging 
 import atexit
 from datetime import datetime
-from luma.core.interface.serial import spi
-from luma.oled.device import ssd1322
 from PIL import Image, ImageDraw, ImageSequence
 import sys
-import requests
-import RPi.GPIO as GPIO
 from playback import Playback
 from clock import Clock
 from volumio_listener import VolumioListener
-from rotary import RotaryControl
 from mode_Manager import ModeManager
 from menus import PlaylistManager, RadioManager
 from menu_manager import MenuManager
-from buttonsleds import ButtonsLEDController
-from socketIO_client_nexus import SocketIO, LoggingNamespace
+from state_store import StateStore
+from album_art_cache import AlbumArtCache, AlbumArtFetcher
+from listing_cache import ListingCache
+from display_compositor import DisplayCompositor
+from display_backend import create_device
+from volumio_client import get_client
+from volume_controller import VolumeController
+from volumio_socket import get_socket
 
-GPIO.setwarnings(False)
+# The single Socket.IO connection to Volumio, shared by the buttons, the listener and playback
+volumioIO = get_socket('localhost', 3000)
 
-# Initialize a single SocketIO connection with LoggingNamespace
-volumioIO = SocketIO('localhost', 3000, LoggingNamespace)
+# Single in-process copy of the Volumio state, fed by VolumioListener's pushState handler
+state_store = StateStore()
 
 LOADING_GIF_PATH = "/home/volumio/Quadify/Loading.gif"
 
 # Timers
 LOGO_DISPLAY_TIME = 5
+
+# "ssd1322" drives the panel over SPI; "headless" renders in memory, recording frames to QUADIFY_RECORD if set
+DISPLAY_BACKEND = os.environ.get("QUADIFY_DISPLAY", "ssd1322")
+RECORD_PATH = os.environ.get("QUADIFY_RECORD")
+# The buttons, LEDs and rotary encoder are only set up with the panel, so headless runs off a Pi
+HAS_HARDWARE = DISPLAY_BACKEND != "headless"
+
+if HAS_HARDWARE:
+    # Imported here because RPi.GPIO and smbus only exist on the Pi
+    import RPi.GPIO as GPIO
+    from rotary import RotaryControl
+    from buttonsleds import ButtonsLEDController
+
+    GPIO.setwarnings(False)
+
+# BCM pin wired to the MCP23017 INT line; None scans the button matrix by adaptive polling
+BUTTONS_INT_PIN = None
 last_button_press_time = 0
 
 # Initialize OLED display
 def initialize_display():
     print("Initializing OLED display...")
-    serial = spi(device=0, port=0)
-    device = ssd1322(serial, rotate=2)
+    device = create_device(DISPLAY_BACKEND, record_path=RECORD_PATH)
     print("OLED display initialized successfully.")
-    return device
+    # Every screen draws through the compositor, which only sends the regions that changed
+    return DisplayCompositor(device)
 
-# Initialize ButtonsLEDController
-controller = ButtonsLEDController(volumioIO=volumioIO)
+if HAS_HARDWARE:
+    # Initialize ButtonsLEDController
+    controller = ButtonsLEDController(volumioIO=volumioIO, state_store=state_store, int_pin=BUTTONS_INT_PIN)
 
-# Start button checking and Volumio status update in separate threads
-button_thread = threading.Thread(target=controller.check_buttons_and_update_leds, daemon=True)
-status_thread = threading.Thread(target=controller.start_status_update_loop, daemon=True)
+    # Start button checking and Volumio status update in separate threads
+    button_thread = threading.Thread(target=controller.check_buttons_and_update_leds, daemon=True)
+    status_thread = threading.Thread(target=controller.start_status_update_loop, daemon=True)
 
-button_thread.start()
-status_thread.start()
+    button_thread.start()
+    status_thread.start()
 
 device = initialize_display()
 clock = Clock(device)
 
+# Optimistic volume shared by the rotary encoder and the playback screen
+volume_controller = VolumeController(state_store=state_store)
+
+# Background album-art worker shared by the playback screen and the radio browser
+album_art_fetcher = AlbumArtFetcher(AlbumArtCache())
+
 # Instantiate ModeManager first without other dependencies
-mode_manager = ModeManager(device, clock)
+mode_manager = ModeManager(
+    device, clock,
+    state_store=state_store, album_art_fetcher=album_art_fetcher, volume_controller=volume_controller
+)
 
-# Initialize VolumioListener with the handle_state_change callback
+# Initialize VolumioListener; ModeManager receives state changes through the shared store
 listener = VolumioListener(
-    on_state_change_callback=mode_manager.process_state_change,
     oled=device,
     clock=clock,
     mode_manager=mode_manager,
+    state_store=state_store,
+    volume_controller=volume_controller,
+    listing_cache=ListingCache(ttl=600),  # Menus draw cached listings at once and refresh stale ones
 )
 
 # Initialize other components with listener and ModeManager references
 menu_manager = MenuManager(device, listener, mode_manager)
 playlist_manager = PlaylistManager(device, listener, mode_manager)
-radio_manager = RadioManager(device, listener, mode_manager)
+radio_manager = RadioManager(device, listener, mode_manager, album_art_fetcher=album_art_fetcher)
 
 # Now that all components are initialized, set ModeManager dependencies
 mode_manager.menu_manager = menu_manager
 mode_manager.playlist_manager = playlist_manager
 mode_manager.radio_manager = radio_manager
+mode_manager.volumio_listener = listener  # Playback sends commands over the listener's connection
 #mode_manager.rotary_control = rotary_control
 
 
@@ -84,19 +117,7 @@ managers = {
 # Define get_volumio_state
 def get_volumio_state():
     """Helper function to fetch the current Volumio state."""
-    try:
-        response = requests.get("http://localhost:3000/api/v1/getState")
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Failed to get Volumio state. Status code: {response.status_code}")
-    except requests.RequestException as e:
-        print(f"Error fetching data from Volumio: {e}")
-    return None
-
-def handle_state_change(state):
-    """Sends state changes to ModeManager and lets it handle mode decisions."""
-    mode_manager.process_state_change(state)
+    return get_client().get_state()
 
 def is_correct_time():
     """Checks if the system time has been updated to a realistic time."""
@@ -148,8 +169,8 @@ print("Set initial mode to clock and started clock display.")
 # Fetch and handle the initial Volumio state
 initial_state = get_volumio_state()  # Ensure initial_state is defined
 if initial_state:
-    # Process the initial Volumio state using ModeManager
-    mode_manager.process_state_change(initial_state)
+    # Seed the shared store; ModeManager and the other subscribers react to it
+    state_store.update(initial_state)
 else:
     # If unable to fetch state, default to clock mode
     print("Unable to fetch Volumio state. Defaulting to clock mode.")
@@ -174,10 +195,12 @@ def screen_update(current_mode):
     elif current_mode == "clock":
         print("Switching to Clock Mode")
         clock.start()
+        clock.redraw()  # The clock may have been running already; repaint over the clear above
     elif current_mode == "playback":
         print("Switching to Playback Mode")
         if mode_manager.playback:
             mode_manager.playback.start()
+            mode_manager.playback.redraw()  # Its first frame may have landed before the clears
     elif current_mode == "webradio":
         print("Switching to Webradio Mode")
         if mode_manager.radio_manager:
@@ -196,41 +219,25 @@ mode_manager.add_on_mode_change_callback(screen_update)
 # Define adjust_volume function
 def adjust_volume(volume_change):
     """Adjusts the volume by the specified amount (+/-)."""
-    try:
-        # Get the current volume to adjust it
-        response = requests.get("http://localhost:3000/api/v1/getState")
-        if response.status_code == 200:
-            data = response.json()
-            current_volume = data.get("volume", 0)
-            if current_volume is None:
-                current_volume = 0  # Set to 0 if current volume is not available
-
-            # Calculate the new volume, clamping it between 0 and 100
-            new_volume = max(0, min(100, current_volume + volume_change))
-            
-            # Make a request to Volumio to update the volume
-            requests.get(f"http://localhost:3000/api/v1/commands/?cmd=volume&volume={new_volume}")
-            print(f"Volume adjusted to: {new_volume}%")
-        else:
-            print(f"Failed to get current volume from Volumio. Status code: {response.status_code}")
-    except requests.RequestException as e:
-        print(f"Error adjusting volume: {e}")
+    volume_controller.adjust(volume_change)
 
 # Create instance of RotaryControl
-rotary_control = RotaryControl(
-    clk_pin=13,
-    dt_pin=5,
-    sw_pin=6,
-    rotation_callback=mode_manager.handle_rotation,
-    button_callback=mode_manager.handle_button_press,
-    mode_manager=mode_manager
-)
+rotary_control = None
+if HAS_HARDWARE:
+    rotary_control = RotaryControl(
+        clk_pin=13,
+        dt_pin=5,
+        sw_pin=6,
+        rotation_callback=mode_manager.handle_rotation,
+        button_callback=mode_manager.handle_button_press,
+        long_press_callback=mode_manager.handle_long_press,
+        mode_manager=mode_manager,
+        state_store=state_store,
+        volume_controller=volume_controller
+    )
 
 mode_manager.rotary_control = rotary_control
 
-# Initialize the last_status attribute for handle_state_change
-handle_state_change.last_status = None
-
 # Initialize PlaylistManager using the listener instance
 #playlist_manager = PlaylistManager(device, listener, mode_manager)
 #print("PlaylistManager initialized successfully.")
@@ -248,7 +255,8 @@ start_listener()
 def cleanup():
     GPIO.cleanup()
 
-atexit.register(cleanup)
+if HAS_HARDWARE:
+    atexit.register(cleanup)
 
 # Main loop
 if __name__ == "__main__":
@@ -260,4 +268,8 @@ if __name__ == "__main__":
         print("\nTerminating gracefully...")
         clock.stop()
         mode_manager.clear_screen()
-        rotary_control.stop()
+        if rotary_control:
+            rotary_control.stop()
+        listener.listing_cache.flush()  # Writes listings still waiting for the background save
+        if DISPLAY_BACKEND == "headless":
+            device.cleanup()  # Flushes the frame recording
@@ -1,14 +1,16 @@
 from PIL import Image, ImageDraw, ImageFont
+from resources import get_font, OPEN_SANS
+from list_view import ListView
 
 class MenuManager:
     def __init__(self, oled, volumio_listener, mode_manager):
         self.oled = oled
-        self.font_path = "/home/volumio/Quadify/OpenSans-Regular.ttf"
         try:
-            self.font = ImageFont.truetype(self.font_path, 12)
+            self.font = get_font(OPEN_SANS, 12)
         except IOError:
-            print(f"Font file not found at {self.font_path}. Using default font.")
+            print(f"Font file {OPEN_SANS} not found. Using default font.")
             self.font = ImageFont.load_default()
+        self.list_view = ListView(oled.mode, (oled.width, oled.height), self.font, rows=4, top=1)
 
         self.menu_stack = []  # Stack to keep track of menu levels
         self.current_menu_items = []  # Items in the current menu
@@ -44,29 +46,12 @@ class MenuManager:
         self.clear_display()
 
     def display_menu(self):
-        max_visible_items = 4  # Number of items visible on the screen
         total_items = len(self.current_menu_items)
+        start_index = self.list_view.window_start(self.current_selection_index, total_items)
+        end_index = min(start_index + self.list_view.rows, total_items)
 
-        # Calculate the visible window of menu items
-        start_index = max(0, min(self.current_selection_index - max_visible_items // 2, total_items - max_visible_items))
-        end_index = min(start_index + max_visible_items, total_items)
-
-        image = Image.new(self.oled.mode, (self.oled.width, self.oled.height), "black")
-        draw = ImageDraw.Draw(image)
-        y_offset = 1
-        x_offset = 10
-
-        # Draw the visible menu items within the calculated window
-        for i in range(start_index, end_index):
-            item = self.current_menu_items[i]
-            if i == self.current_selection_index:
-                draw.text((x_offset, y_offset), "->", font=self.font, fill="white")
-                draw.text((x_offset + 20, y_offset), item, font=self.font, fill="white")
-            else:
-                draw.text((x_offset + 20, y_offset), item, font=self.font, fill="gray")
-            y_offset += 15
-
-        self.oled.display(image)
+        # Only the visible window of menu items is drawn
+        self.oled.display(self.list_view.render(self.current_menu_items, self.current_selection_index))
         print(f"[MenuManager] Displaying menu items from index {start_index} to {end_index}. Current selection index: {self.current_selection_index}")
 
 
@@ -1,16 +1,21 @@
 from PIL import Image, ImageDraw, ImageFont
+from resources import get_font, OPEN_SANS
+from list_view import ListView
+from title_index import TitleIndex
 
 class PlaylistManager:
     def __init__(self, oled, volumio_listener, mode_manager):
         self.oled = oled
-        self.font_path = "/home/volumio/Quadify/OpenSans-Regular.ttf"
         try:
-            self.font = ImageFont.truetype(self.font_path, 12)
+            self.font = get_font(OPEN_SANS, 12)
         except IOError:
-            print(f"Font file not found at {self.font_path}. Using default font.")
+            print(f"Font file {OPEN_SANS} not found. Using default font.")
             self.font = ImageFont.load_default()
+        self.list_view = ListView(oled.mode, (oled.width, oled.height), self.font, rows=4, top=1)
 
         self.playlists = []
+        self.playlist_index = TitleIndex([])  # Rebuilt with each playlist listing
+        self.letter_jump = None  # Current letter while the rotary jumps between letters
         self.current_selection_index = 0
         self.is_active = False
         self.is_loading = False
@@ -18,15 +23,32 @@ class PlaylistManager:
         self.mode_manager = mode_manager
         self.mode_manager.add_on_mode_change_callback(self.handle_mode_change)
         
-        # Register playlists callback and fetch playlists immediately
-        self.volumio_listener.register_playlists_callback(self.update_playlists)
+        # Fetch playlists immediately
         self.fetch_playlists()
 
     def fetch_playlists(self):
-        """Fetch playlists from Volumio and display them immediately upon initialization."""
-        print("[PlaylistManager] Fetching playlists on initialization...")
-        self.is_loading = True
-        self.volumio_listener.fetch_playlists()
+        """Shows cached playlists at once and fetches them from Volumio if the cache is stale or empty."""
+        cached, future = self.volumio_listener.browse_cached('playlists')
+        if cached is not None:
+            playlists = self.volumio_listener.playlist_items(cached)
+            if playlists != self.playlists:
+                self.update_playlists(playlists)
+        if future:
+            print("[PlaylistManager] Fetching playlists...")
+            self.is_loading = True
+            future.add_done_callback(self._on_playlists_fetched)
+
+    def _on_playlists_fetched(self, future):
+        self.is_loading = False
+        if future.exception():
+            print(f"[PlaylistManager] Could not fetch playlists: {future.exception()}")
+            if self.is_active and not self.playlists:
+                self.display_no_playlists_message()
+            return
+        playlists = self.volumio_listener.playlist_items(future.result())
+        if playlists == self.playlists and self.playlists:
+            return  # Background refresh found nothing new
+        self.update_playlists(playlists)
 
 
     def handle_mode_change(self, current_mode):
@@ -40,14 +62,16 @@ class PlaylistManager:
     def start_playlist_mode(self):
         self.is_active = True
         self.current_selection_index = 0
+        self.letter_jump = None
         
         if not self.playlists:
             # If playlists haven't been fetched yet, display loading
             self.display_loading_screen()
-            self.fetch_playlists()
         else:
             # If playlists are ready, display them immediately
             self.display_playlists()
+        # Fresh cached playlists need no request; stale ones are refreshed in the background
+        self.fetch_playlists()
 
 
     def display_loading_screen(self):
@@ -63,6 +87,7 @@ class PlaylistManager:
 
     def stop_playlist_mode(self):
         self.is_active = False
+        self.letter_jump = None
         self.clear_display()
         print(f"[PlaylistManager] Exiting playlist mode - is_active set to: {self.is_active}")
 
@@ -71,6 +96,10 @@ class PlaylistManager:
 
         # Assign playlists and log details
         self.playlists = playlists or []
+        self.playlist_index = TitleIndex(self.playlists)
+        if self.current_selection_index >= len(self.playlists):
+            self.current_selection_index = 0
+            self.letter_jump = None
         print(f"[PlaylistManager] After assignment - playlists count: {len(self.playlists)}")
         
         # Only display playlists if PlaylistManager is active
@@ -94,21 +123,10 @@ class PlaylistManager:
             self.display_no_playlists_message()
             return
 
-        # Proceed to display playlists if they exist
-        image = Image.new(self.oled.mode, (self.oled.width, self.oled.height), "black")
-        draw = ImageDraw.Draw(image)
-        y_offset = 1
-        x_offset = 10
-
-        for i, playlist in enumerate(self.playlists):
-            title = playlist['title']
-            if i == self.current_selection_index:
-                draw.text((x_offset, y_offset), "->", font=self.font, fill="white")
-                draw.text((x_offset + 20, y_offset), title, font=self.font, fill="white")
-            else:
-                draw.text((x_offset + 20, y_offset), title, font=self.font, fill="gray")
-            y_offset += 15
-
+        # Proceed to display the window of playlists around the selection
+        image = self.list_view.render(
+            self.playlists, self.current_selection_index, title=lambda p: p['title'], badge=self.letter_jump
+        )
         self.oled.display(image)
         print("[PlaylistManager] Playlists displayed on OLED.")
 
@@ -122,10 +140,15 @@ class PlaylistManager:
 
         previous_index = self.current_selection_index
 
-        if direction > 0:  # Scroll down
-            self.current_selection_index = (self.current_selection_index + 1) % len(self.playlists)
-        elif direction < 0:  # Scroll up
-            self.current_selection_index = (self.current_selection_index - 1) % len(self.playlists)
+        # `direction` is a signed step count (fast spins arrive as bigger steps); clamp at the ends.
+        # In letter jump mode each detent moves to the first playlist of the next/previous letter instead,
+        # one letter at a time however fast the knob turns.
+        if self.letter_jump:
+            self.letter_jump, self.current_selection_index = self.playlist_index.step_letter(
+                self.current_selection_index, 1 if direction > 0 else -1
+            )
+        else:
+            self.current_selection_index = max(0, min(len(self.playlists) - 1, self.current_selection_index + direction))
 
         if previous_index != self.current_selection_index:
             print(f"[PlaylistManager] Scrolled to playlist index: {self.current_selection_index}")
@@ -143,6 +166,12 @@ class PlaylistManager:
             print("[PlaylistManager] PlaylistManager is not active. Cannot select playlist.")
             return
 
+        if self.letter_jump:
+            # The press accepts the letter; the rotary scrolls playlist by playlist again
+            self.letter_jump = None
+            self.display_playlists()
+            return
+
         # Check if there are any playlists to select from
         if self.playlists:
             # Ensure the current selection index is within bounds
@@ -161,6 +190,18 @@ class PlaylistManager:
 
     
 
+    def start_letter_jump(self):
+        """
+        Switches the rotary to jumping between the playlists' first letters. Returns False (and leaves the
+        normal scrolling alone) if there is nothing to jump through or letter jump is already on.
+        """
+        if not self.is_active or not self.playlists or self.letter_jump:
+            return False
+        self.letter_jump = self.playlist_index.letter_at(self.current_selection_index)
+        print(f"[PlaylistManager] Letter jump mode at '{self.letter_jump}'.")
+        self.display_playlists()
+        return True
+
     def display_no_playlists_message(self):
         self.clear_display()  # Clear screen before displaying message
         image = Image.new(self.oled.mode, (self.oled.width, self.oled.height), "black")
@@ -1,32 +1,43 @@
 from PIL import Image, ImageDraw, ImageFont
+from resources import get_font, OPEN_SANS
+from list_view import ListView
+from title_index import TitleIndex
 
 class RadioManager:
     WINDOW_SIZE = 5  # Number of lines to display at once
 
-    def __init__(self, oled, volumio_listener, mode_manager):
+    def __init__(self, oled, volumio_listener, mode_manager, album_art_fetcher=None):
         print("[Debug] Initializing RadioManager")
         # Initialize essential components
         self.oled = oled
         self.volumio_listener = volumio_listener
         self.mode_manager = mode_manager
+        self.album_art_fetcher = album_art_fetcher  # Optional; warms station art while browsing
 
         # Set up initial menu and display state
         self.current_menu = "categories"  # Start in the categories menu by default
         self.current_selection_index = 0
         self.window_start_index = 0  # Start index of the visible window
         self.categories = ["My Web Radios", "Popular Radios", "BBC Radios"]
+        self.category_uris = {
+            "My Web Radios": 'radio/myWebRadio',
+            "Popular Radios": 'radio/tunein/popular',
+            "BBC Radios": 'radio/bbc',
+        }
+        self.requested_uri = None  # Only the listing for this URI may be painted
         self.stations = []
+        self.station_index = TitleIndex([])  # Rebuilt with each station listing
+        self.letter_jump = None  # Current letter while the rotary jumps between letters
 
         # Set up the font
-        self.font_path = "/home/volumio/Quadify/OpenSans-Regular.ttf"
         try:
-            self.font = ImageFont.truetype(self.font_path, 12)
+            self.font = get_font(OPEN_SANS, 12)
         except IOError:
-            print(f"Font file not found at {self.font_path}. Using default font.")
+            print(f"Font file {OPEN_SANS} not found. Using default font.")
             self.font = ImageFont.load_default()
-
-        # Register callback to update stations when fetched from Volumio
-        self.volumio_listener.register_webradio_callback(self.update_stations)
+        self.list_view = ListView(
+            oled.mode, (oled.width, oled.height), self.font, rows=self.WINDOW_SIZE, arrow_x=5, text_x=20
+        )
 
         # Display the categories initially
         self.display_categories()
@@ -40,12 +51,15 @@ class RadioManager:
         self.current_selection_index = 0
         self.window_start_index = 0
         self.current_menu = "categories"
+        self.requested_uri = None
+        self.letter_jump = None
         self.mode_manager.current_mode = "webradio"
         self.display_categories()
         print("[RadioManager] Categories displayed. Waiting for user input.")
 
     def stop_mode(self):
         print("[RadioManager] Exiting radio mode and clearing display.")
+        self.letter_jump = None
         self.clear_display()
 
     def handle_mode_change(self, new_mode):
@@ -57,24 +71,8 @@ class RadioManager:
 
     def display_categories(self):
         print("[RadioManager] Displaying categories menu on OLED.")
-        image = Image.new(self.oled.mode, (self.oled.width, self.oled.height), "black")
-        draw = ImageDraw.Draw(image)
-
-        visible_categories = self.get_visible_window(self.categories)
-        y_offset = 0
-        x_offset_arrow = 5
-        x_offset_text = 20
-
-        for i, category in enumerate(visible_categories):
-            actual_index = self.window_start_index + i
-            if actual_index == self.current_selection_index:
-                draw.text((x_offset_arrow, y_offset), "->", font=self.font, fill="white")
-                draw.text((x_offset_text, y_offset), category, font=self.font, fill="white")
-            else:
-                draw.text((x_offset_text, y_offset), category, font=self.font, fill="gray")
-            y_offset += 15
-
-        self.oled.display(image)
+        self.get_visible_window(self.categories)
+        self.oled.display(self.list_view.render(self.categories, self.current_selection_index))
         print("[RadioManager] Categories displayed successfully.")
 
     def display_stations(self):
@@ -84,66 +82,76 @@ class RadioManager:
             return
 
         print("[RadioManager] Displaying stations on OLED.")
-        image = Image.new(self.oled.mode, (self.oled.width, self.oled.height), "black")
-        draw = ImageDraw.Draw(image)
-
-        visible_stations = self.get_visible_window([station['title'] for station in self.stations])
-        y_offset = 0
-        x_offset_arrow = 5
-        x_offset_text = 20
-
-        for i, station_title in enumerate(visible_stations):
-            actual_index = self.window_start_index + i
-            if actual_index == self.current_selection_index:
-                draw.text((x_offset_arrow, y_offset), "->", font=self.font, fill="white")
-                draw.text((x_offset_text, y_offset), station_title, font=self.font, fill="white")
-            else:
-                draw.text((x_offset_text, y_offset), station_title, font=self.font, fill="gray")
-            y_offset += 15
-
+        self.get_visible_window(self.stations)
+        image = self.list_view.render(
+            self.stations, self.current_selection_index, title=lambda s: s['title'], badge=self.letter_jump
+        )
         self.oled.display(image)
         print("[RadioManager] Stations displayed successfully.")
+        self.prefetch_album_art()
+
+    def prefetch_album_art(self):
+        """Prefetches art for the visible stations plus one window either side."""
+        if not self.album_art_fetcher:
+            return
+        start = max(0, self.window_start_index - self.WINDOW_SIZE)
+        end = self.window_start_index + 2 * self.WINDOW_SIZE
+        self.album_art_fetcher.prefetch(
+            station['albumart'] for station in self.stations[start:end] if station.get('albumart')
+        )
 
     def get_visible_window(self, items):
         """
         Determines the subset of items to display based on the current selection index.
         Ensures that the selected item is centered whenever possible.
         """
-        total_items = len(items)
-        half_window = self.WINDOW_SIZE // 2
-
-        if total_items <= self.WINDOW_SIZE:
-            self.window_start_index = 0
-        else:
-            if self.current_selection_index < half_window:
-                self.window_start_index = 0
-            elif self.current_selection_index > total_items - half_window - 1:
-                self.window_start_index = total_items - self.WINDOW_SIZE
-            else:
-                self.window_start_index = self.current_selection_index - half_window
-
-        # Ensure window_start_index is within bounds
-        self.window_start_index = max(0, min(self.window_start_index, total_items - self.WINDOW_SIZE))
-
+        self.window_start_index = self.list_view.window_start(self.current_selection_index, len(items))
         end_index = self.window_start_index + self.WINDOW_SIZE
         return items[self.window_start_index:end_index]
 
-    def update_stations(self, stations):
+    def _on_stations_fetched(self, uri, future):
+        # The user may have moved on to another category (or left it) while this listing was loading
+        if uri != self.requested_uri or self.current_menu != "stations":
+            print(f"[RadioManager] Discarding stale station listing for '{uri}'.")
+            return
+        if future.exception():
+            print(f"[RadioManager] Could not fetch stations for '{uri}': {future.exception()}")
+            if not self.stations:
+                self.update_stations([])
+            return
+        stations = self.volumio_listener.webradio_items(future.result())
+        if self.stations and [s['uri'].strip() for s in stations] == [s['uri'] for s in self.stations]:
+            return  # Background refresh of the cached listing found nothing new
+        self.update_stations(stations, keep_selection=bool(self.stations))
+
+    def update_stations(self, stations, keep_selection=False):
         """Update the list of available radio stations."""
         print(f"[RadioManager] Updating stations with received data.")
 
         # Update the stations list with new data
+        previous_stations = self.stations
         self.stations = [
-            {'title': station.get('title', 'Untitled').strip(), 'uri': station.get('uri', '').strip()}
+            {
+                'title': station.get('title', 'Untitled').strip(),
+                'uri': station.get('uri', '').strip(),
+                'albumart': station.get('albumart', '')
+            }
             for station in stations
         ]
+        self.station_index = TitleIndex(self.stations)
 
         # Debug output of stations received
         print(f"[Debug] Stations updated: {self.stations}")
 
-        # Reset selection indices when new stations are loaded
-        self.current_selection_index = 0
-        self.window_start_index = 0
+        # Reset selection indices when new stations are loaded; a refresh keeps the selected station
+        selected_uri = None
+        if keep_selection and 0 <= self.current_selection_index < len(previous_stations):
+            selected_uri = previous_stations[self.current_selection_index]['uri']
+        position = self.station_index.position(selected_uri) if selected_uri else None
+        self.current_selection_index = position if position is not None else 0
+        if position is None:
+            self.letter_jump = None
+        self.get_visible_window(self.stations)
 
         # Display the stations if available, otherwise show 'No Stations Found' message
         if self.stations:
@@ -157,7 +165,7 @@ class RadioManager:
         if self.current_menu == "categories":
             options = self.categories
         else:
-            options = [station['title'] for station in self.stations]
+            options = self.stations
 
         if not options:
             print("[RadioManager] No options available to scroll.")
@@ -165,13 +173,15 @@ class RadioManager:
 
         previous_index = self.current_selection_index
 
-        # Ensure direction is an integer and handle scroll up/down correctly
-        if isinstance(direction, int) and direction > 0:  # Scroll down
-            if self.current_selection_index < len(options) - 1:
-                self.current_selection_index += 1
-        elif isinstance(direction, int) and direction < 0:  # Scroll up
-            if self.current_selection_index > 0:
-                self.current_selection_index -= 1
+        # `direction` is a signed step count (fast spins arrive as bigger steps); clamp at the ends.
+        # In letter jump mode each detent moves to the first station of the next/previous letter instead,
+        # one letter at a time however fast the knob turns.
+        if self.letter_jump and isinstance(direction, int) and direction:
+            self.letter_jump, self.current_selection_index = self.station_index.step_letter(
+                self.current_selection_index, 1 if direction > 0 else -1
+            )
+        elif isinstance(direction, int) and direction:
+            self.current_selection_index = max(0, min(len(options) - 1, self.current_selection_index + direction))
         else:
             print("[RadioManager] Invalid scroll direction provided.")
             return
@@ -195,27 +205,39 @@ class RadioManager:
             selected_category = self.categories[self.current_selection_index]
             print(f"Selected radio category: {selected_category}")
 
-            if selected_category == "My Web Radios":
-                self.volumio_listener.fetch_webradio_stations('radio/myWebRadio')
-            elif selected_category == "Popular Radios":
-                self.volumio_listener.fetch_webradio_stations('radio/tunein/popular')
-            elif selected_category == "BBC Radios":
-                self.volumio_listener.fetch_webradio_stations('radio/bbc')
-            else:
+            uri = self.category_uris.get(selected_category)
+            if not uri:
                 print(f"[Warning] Unknown category selected: {selected_category}")
+                return
 
-            # Move to stations menu without displaying yet
+            # Move to stations menu; it is drawn from the cache or once the listing arrives
             self.current_menu = "stations"
             self.current_selection_index = 0
             self.window_start_index = 0
+            self.requested_uri = uri
+            self.stations = []  # Never show or scroll the previous category's stations
+            self.station_index = TitleIndex([])
+            self.letter_jump = None
             print(f"[RadioManager] Switched to stations for category: {selected_category}")
 
+            cached, future = self.volumio_listener.browse_cached(uri)
+            if cached is not None:
+                self.update_stations(self.volumio_listener.webradio_items(cached))
+            if future:
+                future.add_done_callback(lambda f, uri=uri: self._on_stations_fetched(uri, f))
+
         elif self.current_menu == "stations":
             # Selecting a station to play
             if not self.stations:
                 print("[Error] No stations available to select.")
                 return
 
+            if self.letter_jump:
+                # The press accepts the letter; the rotary scrolls station by station again
+                self.letter_jump = None
+                self.display_stations()
+                return
+
             selected_station = self.stations[self.current_selection_index]
             station_title = selected_station['title'].strip()
             print(f"Attempting to play station: {station_title}")
@@ -228,6 +250,18 @@ class RadioManager:
             except Exception as e:
                 print(f"[Error] Failed to play station '{station_title}': {e}")
 
+    def start_letter_jump(self):
+        """
+        Switches the rotary to jumping between the stations' first letters. Returns False (and leaves the
+        normal scrolling alone) if not browsing stations or already letter-jumping.
+        """
+        if self.current_menu != "stations" or not self.stations or self.letter_jump:
+            return False
+        self.letter_jump = self.station_index.letter_at(self.current_selection_index)
+        print(f"[RadioManager] Letter jump mode at '{self.letter_jump}'.")
+        self.display_stations()
+        return True
+
     def display_no_stations_message(self):
         print("[RadioManager] Displaying 'No Stations Found' message on OLED.")
         image = Image.new(self.oled.mode, (self.oled.width, self.oled.height), "black")
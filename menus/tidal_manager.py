@@ -1,5 +1,7 @@
 # menus/tidal_manager.py
 from PIL import Image, ImageDraw, ImageFont
+from resources import get_font, OPEN_SANS
+from list_view import ListView
 
 class TidalManager:
     def __init__(self, oled, volumio_listener, mode_manager):
@@ -15,12 +17,12 @@ class TidalManager:
         self.tidal_content = []
 
         # Set up the font
-        self.font_path = "/home/volumio/Quadify/OpenSans-Regular.ttf"
         try:
-            self.font = ImageFont.truetype(self.font_path, 12)
+            self.font = get_font(OPEN_SANS, 12)
         except IOError:
-            print(f"Font file not found at {self.font_path}. Using default font.")
+            print(f"Font file {OPEN_SANS} not found. Using default font.")
             self.font = ImageFont.load_default()
+        self.list_view = ListView(oled.mode, (oled.width, oled.height), self.font, rows=4)
 
         # Register callback to update Tidal content when fetched from Volumio
         self.volumio_listener.register_tidal_callback(self.update_tidal_content)
@@ -48,20 +50,7 @@ class TidalManager:
             self.stop_mode()
 
     def display_categories(self):
-        image = Image.new(self.oled.mode, (self.oled.width, self.oled.height), "black")
-        draw = ImageDraw.Draw(image)
-        y_offset = 0
-        x_offset = 10
-
-        for i, category in enumerate(self.categories):
-            if i == self.current_selection_index:
-                draw.text((x_offset, y_offset), "->", font=self.font, fill="white")
-                draw.text((x_offset + 20, y_offset), category, font=self.font, fill="white")
-            else:
-                draw.text((x_offset + 20, y_offset), category, font=self.font, fill="gray")
-            y_offset += 15
-
-        self.oled.display(image)
+        self.oled.display(self.list_view.render(self.categories, self.current_selection_index))
 
     def display_tidal_content(self):
         if not self.tidal_content:
@@ -69,20 +58,8 @@ class TidalManager:
             self.display_no_content_message()
             return
 
-        image = Image.new(self.oled.mode, (self.oled.width, self.oled.height), "black")
-        draw = ImageDraw.Draw(image)
-        y_offset = 0
-        x_offset = 10
-
-        for i, item in enumerate(self.tidal_content):
-            title = item['title']
-            if i == self.current_selection_index:
-                draw.text((x_offset, y_offset), "->", font=self.font, fill="white")
-                draw.text((x_offset + 20, y_offset), title, font=self.font, fill="white")
-            else:
-                draw.text((x_offset + 20, y_offset), title, font=self.font, fill="gray")
-            y_offset += 15
-
+        # Only the window around the selection is drawn, however long the listing is
+        image = self.list_view.render(self.tidal_content, self.current_selection_index, title=lambda item: item['title'])
         self.oled.display(image)
 
     def scroll_selection(self, direction):
@@ -95,10 +72,8 @@ class TidalManager:
             return
 
         previous_index = self.current_selection_index
-        if direction > 0:  # Scroll down
-            self.current_selection_index = (self.current_selection_index + 1) % len(options)
-        elif direction < 0:  # Scroll up
-            self.current_selection_index = (self.current_selection_index - 1) % len(options)
+        # `direction` is a signed step count (fast spins arrive as bigger steps); clamp at the ends
+        self.current_selection_index = max(0, min(len(options) - 1, self.current_selection_index + direction))
 
         if previous_index != self.current_selection_index:
             print(f"Scrolled to index: {self.current_selection_index}")
@@ -0,0 +1,529 @@
+import re
+import csv
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_STATE = {
+    "status": "stop", "position": 0, "title": "", "artist": "", "album": "", "albumart": "/albumart",
+    "uri": "", "trackType": "flac", "seek": 0, "duration": 0, "samplerate": "44.1 KHz", "bitdepth": "16 bit",
+    "bitrate": "", "channels": 2, "random": False, "repeat": False, "repeatSingle": False, "consume": False,
+    "volume": 50, "mute": False, "disableVolumeControl": False, "stream": False, "service": "mpd",
+}
+FORMATS = [("flac", "44.1 KHz", "16 bit"), ("flac", "96 KHz", "24 bit"), ("dsf", "2.82 MHz", "1 bit"),
+           ("mp3", "44.1 KHz", "16 bit"), ("flac", "192 KHz", "24 bit"), ("wav", "48 KHz", "24 bit")]
+STATION_NAMES = ["Radio Paradise", "BBC Radio", "Jazz FM", "Classic Rock", "Deep House", "Ambient Sleep",
+                 "Café Lounge", "News Talk", "Country Roads", "Lo-Fi Beats", "Opera Live", "Reggae Sun"]
+
+def make_tracks(count, album="Mock Album"):
+    tracks = []
+    for n in range(count):
+        track_type, samplerate, bitdepth = FORMATS[n % len(FORMATS)]
+        tracks.append({
+            "title": f"Track {n + 1}", "artist": "Mock Artist", "album": album, "uri": f"mnt/mock/{album}/{n + 1}",
+            "albumart": "/albumart", "trackType": track_type, "samplerate": samplerate, "bitdepth": bitdepth,
+            "bitrate": "", "duration": 180 + n % 120, "service": "mpd",
+        })
+    return tracks
+
+def make_stations(count, uri, item_type="webradio"):
+    return [
+        {
+            "service": "webradio", "type": item_type, "title": f"{STATION_NAMES[n % len(STATION_NAMES)]} {n + 1}",
+            "uri": f"http://stream.example.invalid/{uri}/{n + 1}", "albumart": "", "bitrate": 64 * (1 + n % 5),
+        }
+        for n in range(count)
+    ]
+
+def default_listings():
+    return {
+        "playlists": [
+            {"service": "mpd", "type": "playlist", "title": f"Playlist {n + 1}", "uri": f"playlists/Playlist {n + 1}"}
+            for n in range(12)
+        ],
+        "radio/myWebRadio": make_stations(8, "radio/myWebRadio", "mywebradio"),
+        "radio/tunein/popular": make_stations(60, "radio/tunein/popular"),
+        "radio/bbc": make_stations(14, "radio/bbc"),
+    }
+
+class _Session:
+    """One Engine.IO (protocol 3) client on the long-polling transport."""
+
+    def __init__(self, sid):
+        self.sid = sid
+        self.outbox = []  # Packets waiting for the client's next poll
+        self.condition = threading.Condition()
+        self.last_seen = time.time()
+        self.closed = False
+
+    def send(self, packet):
+        with self.condition:
+            self.outbox.append(packet)
+            self.condition.notify()
+
+    def poll(self, timeout):
+        with self.condition:
+            if not self.outbox and not self.closed:
+                self.condition.wait(timeout)
+            packets, self.outbox = self.outbox, []
+        return packets or ["6"]  # A noop ends an idle poll
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+class MockVolumio:
+    """
+    Local stand-in for Volumio, for driving the listener, playback and buttons without a player.
+
+    It serves the REST calls this project makes (getState, commands) and a Socket.IO server on the
+    Engine.IO long-polling transport that socketIO_client speaks, answering getState, browseLibrary and
+    the transport events with pushState, pushBrowseLibrary and pushQueue like Volumio does.
+
+    `latency` delays every reply and `failure_rate` fails that share of them (500s over REST, dropped
+    replies over Socket.IO). `browse_latency` ({uri: seconds}) overrides the delay for individual
+    browseLibrary URIs, so listings can be answered out of order like Volumio's per-plugin browsing.
+    With `record_pushes`, every push is logged with its send time so it can be matched against recorded
+    frames (see `frame_recorder.py latency`).
+    """
+    PING_INTERVAL = 25000  # Milliseconds, as announced in the Engine.IO handshake
+    PING_TIMEOUT = 60000
+    POLL_TIMEOUT = 20  # Seconds an idle poll is held open
+
+    def __init__(self, host="localhost", port=3000, latency=0.0, failure_rate=0.0, record_pushes=False, seed=None,
+                 browse_latency=None):
+        self.latency = latency
+        self.browse_latency = dict(browse_latency or {})
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.state = dict(DEFAULT_STATE)
+        self.queue = make_tracks(10)
+        self.listings = default_listings()
+        self.sessions = {}
+        self.lock = threading.RLock()
+        self.push_count = 0
+        self.record_pushes = record_pushes
+        self.push_log = []  # (unix time, event, sequence number) of every push when recording
+        self._load_track(0)
+
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self.address = self.httpd.server_address
+
+    def start(self):
+        """Serves on background threads; returns straight away."""
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        threading.Thread(target=self._reap_loop, daemon=True).start()
+        print(f"[MockVolumio] Listening on {self.address[0]}:{self.address[1]}")
+
+    def stop(self):
+        self.disconnect_all()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(5)
+            cutoff = time.time() - self.PING_TIMEOUT / 1000
+            with self.lock:
+                stale = [session for session in self.sessions.values() if session.last_seen < cutoff]
+                for session in stale:
+                    del self.sessions[session.sid]
+            for session in stale:
+                session.close()
+
+    def disconnect_all(self):
+        """Drops every Socket.IO client; their next request fails and they have to reconnect."""
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
+        print(f"[MockVolumio] Dropped {len(sessions)} Socket.IO clients.")
+
+    def should_fail(self):
+        return self.failure_rate > 0 and self.random.random() < self.failure_rate
+
+    # Player model
+
+    def get_state(self):
+        with self.lock:
+            return dict(self.state)
+
+    def _load_track(self, position):
+        if not self.queue:
+            return
+        position %= len(self.queue)
+        track = self.queue[position]
+        self.state.update({field: track.get(field, DEFAULT_STATE.get(field)) for field in
+                           ("title", "artist", "album", "uri", "albumart", "trackType", "samplerate",
+                            "bitdepth", "bitrate", "duration", "service")})
+        self.state.update(position=position, seek=0)
+
+    def apply_command(self, cmd, value=None):
+        """Applies a transport or volume command and pushes the new state. Returns False if unknown."""
+        with self.lock:
+            state = self.state
+            if cmd == "play":
+                state["status"] = "play"
+            elif cmd == "pause":
+                state["status"] = "stop" if state["service"] == "webradio" else "pause"
+            elif cmd == "toggle":
+                playing = state["status"] == "play"
+                self.apply_command("pause" if playing else "play")
+                return True
+            elif cmd == "stop":
+                state["status"] = "stop"
+            elif cmd in ("next", "prev"):
+                if state["random"] and len(self.queue) > 1:
+                    position = self.random.randrange(len(self.queue))
+                else:
+                    position = state["position"] + (1 if cmd == "next" else -1)
+                self._load_track(position)
+            elif cmd == "volume":
+                if value in ("+", "plus"):
+                    volume = state["volume"] + 10
+                elif value in ("-", "minus"):
+                    volume = state["volume"] - 10
+                else:
+                    volume = int(value)
+                state["volume"] = max(0, min(100, volume))
+            elif cmd in ("repeat", "random"):
+                state[cmd] = (not state[cmd]) if value is None else bool(value)
+            else:
+                return False
+        self.push_state()
+        return True
+
+    def play_item(self, item):
+        """replaceAndPlay: replaces the queue with one item (a webradio station here) and plays it."""
+        with self.lock:
+            webradio = item.get("service") == "webradio"
+            self.queue = [{
+                "title": item.get("title", ""), "artist": "", "album": "", "uri": item.get("uri", ""),
+                "albumart": item.get("albumart", ""), "trackType": "webradio" if webradio else "flac",
+                "samplerate": "" if webradio else "44.1 KHz", "bitdepth": "" if webradio else "16 bit",
+                "bitrate": "128 Kbps" if webradio else "", "duration": 0, "service": item.get("service", "mpd"),
+            }]
+            self._load_track(0)
+            self.state["status"] = "play"
+        self.push_queue()
+        self.push_state()
+
+    def play_playlist(self, name):
+        with self.lock:
+            self.queue = make_tracks(15, album=name)
+            self._load_track(0)
+            self.state["status"] = "play"
+        self.push_queue()
+        self.push_state()
+
+    def browse(self, uri):
+        """The pushBrowseLibrary payload for `uri` (an empty list for unknown URIs)."""
+        with self.lock:
+            items = self.listings.get(uri, [])
+        parent = uri.rsplit("/", 1)[0] if "/" in uri else "/"
+        return {"navigation": {"prev": {"uri": parent}, "lists": [
+            {"availableListViews": ["list", "grid"], "items": items}
+        ]}}
+
+    # Socket.IO
+
+    def push(self, event, data, session=None):
+        """Sends `event` to one client, or to every client like Volumio's broadcasts."""
+        packet = "42" + json.dumps([event, data], ensure_ascii=False)
+        with self.lock:
+            self.push_count += 1
+            if self.record_pushes:
+                self.push_log.append((time.time(), event, self.push_count))
+            sessions = [session] if session else list(self.sessions.values())
+        for target in sessions:
+            target.send(packet)
+
+    def push_state(self, session=None):
+        self.push("pushState", self.get_state(), session)
+
+    def push_queue(self, session=None):
+        with self.lock:
+            queue = [dict(track) for track in self.queue]
+        self.push("pushQueue", queue, session)
+
+    def _reply(self, session, send, latency=None):
+        """Runs a reply to a client request, delayed by `latency` (default: the server's) and dropped at `failure_rate`."""
+        if self.should_fail():
+            return
+        latency = self.latency if latency is None else latency
+        if latency:
+            threading.Timer(latency, send).start()
+        else:
+            send()
+
+    def on_event(self, session, event, args, ack_id):
+        data = args[0] if args else None
+        data = data if isinstance(data, dict) else {}
+        ack = None
+        if event == "getState":
+            self._reply(session, lambda: self.push_state(session))
+        elif event == "getQueue":
+            self._reply(session, lambda: self.push_queue(session))
+        elif event == "browseLibrary":
+            uri = data.get("uri", "")
+            reply = self.browse(uri)
+            self._reply(session, lambda: self.push("pushBrowseLibrary", reply, session), self.browse_latency.get(uri))
+        elif event in ("play", "pause", "toggle", "stop", "next", "prev"):
+            ack = self.apply_command(event)
+        elif event == "volume":
+            ack = self.apply_command("volume", args[0] if args else None)
+        elif event in ("setRepeat", "setRandom"):
+            ack = self.apply_command("repeat" if event == "setRepeat" else "random", data.get("value"))
+        elif event == "replaceAndPlay":
+            self.play_item(data)
+            ack = True
+        elif event == "playPlaylist":
+            self.play_playlist(data.get("name", ""))
+            ack = True
+        else:
+            print(f"[MockVolumio] Ignoring unsupported event '{event}'")
+        if ack_id is not None:
+            session.send(f"43{ack_id}" + json.dumps([{"success": bool(ack)}]))
+
+    def open_session(self):
+        session = _Session(uuid.uuid4().hex[:20])
+        with self.lock:
+            self.sessions[session.sid] = session
+        session.send("40")  # Socket.IO connect for the default namespace
+        return session
+
+    def get_session(self, sid):
+        with self.lock:
+            session = self.sessions.get(sid)
+        if session:
+            session.last_seen = time.time()
+        return session
+
+    def on_packet(self, session, packet):
+        packet_type, data = packet[:1], packet[1:]
+        if packet_type == "1":
+            with self.lock:
+                self.sessions.pop(session.sid, None)
+            session.close()
+        elif packet_type == "2":
+            session.send("3" + data)  # Pong; socketIO_client pings to end its own long poll early
+        elif packet_type == "4" and data[:1] == "2":
+            match = re.match(r"(\d*)(\[.*)", data[1:], re.S)
+            if not match:
+                return
+            try:
+                args = json.loads(match.group(2))
+            except ValueError:
+                return
+            if args:
+                ack_id = int(match.group(1)) if match.group(1) else None
+                self.on_event(session, args[0], args[1:], ack_id)
+        elif packet_type == "4" and data[:1] == "0":
+            session.send("40")
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, as Volumio's server and requests.Session expect
+
+    def log_message(self, format, *args):
+        pass  # One line per poll would drown everything else
+
+    @property
+    def mock(self):
+        return self.server.mock
+
+    def _send(self, status, body, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+        body = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path.startswith("/socket.io"):
+            self._poll(params)
+        elif url.path in ("/api/v1/getState", "/api/v1/getstate"):
+            self._rest(lambda: self.mock.get_state())
+        elif url.path.rstrip("/") == "/api/v1/commands":
+            self._rest(lambda: self._command(params))
+        else:
+            self._send(404, {"error": f"Unknown path {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not url.path.startswith("/socket.io"):
+            self._send(404, {"error": f"Unknown path {url.path}"})
+            return
+        session = self.mock.get_session(params.get("sid"))
+        if not session or session.closed:
+            self._send(400, {"code": 1, "message": "Session ID unknown"})
+            return
+        for packet in decode_payload(body):
+            self.mock.on_packet(session, packet)
+        self._send(200, "ok", "text/html")
+
+    def _rest(self, handle):
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+        if self.mock.should_fail():
+            self._send(500, {"error": "Mock failure"})
+            return
+        result = handle()
+        if result is None:
+            self._send(400, {"error": "Unknown command"})
+        else:
+            self._send(200, result)
+
+    def _command(self, params):
+        cmd = params.get("cmd", "")
+        if not self.mock.apply_command(cmd, params.get("volume") if cmd == "volume" else None):
+            return None
+        return {"time": int(time.time() * 1000), "response": f"{cmd} Success"}
+
+    def _poll(self, params):
+        sid = params.get("sid")
+        if not sid:
+            session = self.mock.open_session()
+            handshake = {"sid": session.sid, "upgrades": [], "pingInterval": self.mock.PING_INTERVAL,
+                         "pingTimeout": self.mock.PING_TIMEOUT}
+            packets = ["0" + json.dumps(handshake)]
+        else:
+            session = self.mock.get_session(sid)
+            if not session or session.closed:
+                self._send(400, {"code": 1, "message": "Session ID unknown"})
+                return
+            packets = session.poll(self.mock.POLL_TIMEOUT)
+        # Engine.IO 3 text payload: <length in characters>:<packet>, repeated
+        self._send(200, "".join(f"{len(packet)}:{packet}" for packet in packets), "text/plain; charset=UTF-8")
+
+def decode_payload(body):
+    """Splits an Engine.IO 3 POST body (binary or text framing) into packet strings."""
+    packets = []
+    if body[:1] in (b"\x00", b"\x01"):
+        i = 0
+        while i < len(body):
+            end = body.index(b"\xff", i)
+            length = int("".join(str(digit) for digit in body[i + 1:end]))
+            packets.append(body[end + 1:end + 1 + length].decode("utf-8"))
+            i = end + 1 + length
+        return packets
+    text = body.decode("utf-8")
+    i = 0
+    while i < len(text):
+        colon = text.index(":", i)
+        length = int(text[i:colon])
+        packets.append(text[colon + 1:colon + 1 + length])
+        i = colon + 1 + length
+    return packets
+
+# Scenarios: run one after another, in command-line order, against a started server
+
+def scenario_track_changes(mock, args):
+    """Skips to the next track every `interval` seconds, `count` times."""
+    mock.apply_command("play")
+    for _ in range(args.count):
+        time.sleep(args.interval)
+        mock.apply_command("next")
+
+def scenario_burst(mock, args):
+    """Pushes `rate` states per second for `duration` seconds, alternating the volume so frames differ."""
+    mock.apply_command("play")
+    tick = 0.01
+    per_tick = max(1, int(args.rate * tick))
+    deadline = time.time() + args.duration
+    next_tick = time.time()
+    sent = 0
+    while time.time() < deadline:
+        for _ in range(per_tick):
+            with mock.lock:
+                mock.state["seek"] += 1
+                mock.state["volume"] = 40 + sent % 20
+            mock.push_state()
+            sent += 1
+        next_tick += tick
+        time.sleep(max(0, next_tick - time.time()))
+    print(f"[MockVolumio] Burst sent {sent} pushState events in {args.duration}s.")
+
+def scenario_disconnects(mock, args):
+    """Drops every client every `interval` seconds, `count` times."""
+    for _ in range(args.count):
+        time.sleep(args.interval)
+        mock.disconnect_all()
+
+def scenario_huge_listings(mock, args):
+    """Replaces every radio listing with `size` stations."""
+    with mock.lock:
+        for uri in list(mock.listings):
+            if uri.startswith("radio/"):
+                mock.listings[uri] = make_stations(args.size, uri)
+    print(f"[MockVolumio] Radio listings now hold {args.size} stations each.")
+
+SCENARIOS = {
+    "track-changes": scenario_track_changes,
+    "burst": scenario_burst,
+    "disconnects": scenario_disconnects,
+    "huge-listings": scenario_huge_listings,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Volumio server for load and latency testing.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), default=[],
+                        help="Scenario to run once clients can connect (repeatable)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every reply")
+    parser.add_argument("--browse-latency", action="append", default=[], metavar="URI=SECONDS",
+                        help="Delay browseLibrary replies for one URI (repeatable), e.g. radio/myWebRadio=3")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of replies that fail (0-1)")
+    parser.add_argument("--rate", type=int, default=1000, help="burst: pushState events per second")
+    parser.add_argument("--duration", type=float, default=5.0, help="burst: seconds")
+    parser.add_argument("--count", type=int, default=50, help="track-changes/disconnects: repetitions")
+    parser.add_argument("--interval", type=float, default=0.2, help="track-changes/disconnects: seconds apart")
+    parser.add_argument("--size", type=int, default=20000, help="huge-listings: stations per listing")
+    parser.add_argument("--delay", type=float, default=5.0, help="Seconds to wait before starting scenarios")
+    parser.add_argument("--push-log", help="Write a CSV of every push (unix time, event, sequence) on exit")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    browse_latency = {}
+    for spec in args.browse_latency:
+        uri, _, seconds = spec.rpartition("=")
+        if not uri:
+            parser.error(f"--browse-latency expects URI=SECONDS, got '{spec}'")
+        browse_latency[uri] = float(seconds)
+
+    mock = MockVolumio(args.host, args.port, latency=args.latency, failure_rate=args.failure_rate,
+                       browse_latency=browse_latency,
+                       record_pushes=bool(args.push_log), seed=args.seed)
+    mock.start()
+    try:
+        time.sleep(args.delay)
+        for name in args.scenario:
+            print(f"[MockVolumio] Running scenario '{name}'.")
+            SCENARIOS[name](mock, args)
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.push_log:
+            with open(args.push_log, "w", newline="") as f:
+                csv.writer(f).writerows(mock.push_log)
+            print(f"[MockVolumio] Wrote {len(mock.push_log)} pushes to {args.push_log}")
+        mock.stop()
@@ -1,6 +1,5 @@
 import time
 import threading
-import RPi.GPIO as GPIO
 from PIL import Image
 from playback import Playback
 from menus import PlaylistManager
@@ -8,7 +7,9 @@ from menus import PlaylistManager
 last_button_press_time = 0  # Initialize button press debounce timer
 
 class ModeManager:
-    def __init__(self, oled, clock, menu_manager=None, playlist_manager=None, volumio_listener=None, rotary_control=None):
+    MODE_FIELDS = ("status", "uri", "title", "service")  # State fields that can change the mode
+
+    def __init__(self, oled, clock, menu_manager=None, playlist_manager=None, volumio_listener=None, rotary_control=None, state_store=None, album_art_fetcher=None, volume_controller=None):
         self.current_mode = "clock"
         self.home_mode = "clock"
         self.is_playing = False
@@ -24,6 +25,13 @@ class ModeManager:
         self._blank_image = Image.new(oled.mode, (oled.width, oled.height), "black") if oled else None
         self.last_button_press_time = 0
         self.stop_delay_timer = None
+        self.state_store = state_store
+        self.album_art_fetcher = album_art_fetcher  # Shared so decoded art survives playback restarts
+        self.volume_controller = volume_controller
+        if self.state_store:
+            # A status change or a new station, playlist or track drives mode decisions;
+            # display-only fields (seek, volume, ...) go straight to Playback
+            self.state_store.subscribe(self.on_state_fields_changed, fields=self.MODE_FIELDS)
 
     def set_mode(self, new_mode, playback_state=None):
         with self.mode_lock:
@@ -71,6 +79,10 @@ class ModeManager:
             self.clock.stop()
             print("Clock mode stopped.")
 
+    def on_state_fields_changed(self, state, changes):
+        """StateStore subscriber for MODE_FIELDS."""
+        self.process_state_change(state)
+
     def process_state_change(self, state):
         """
         Handles playback state changes and updates mode accordingly.
@@ -78,6 +90,11 @@ class ModeManager:
         status = state.get("status", "")
         self.is_playing = status == "play"
 
+        # Hand the state to an active playback screen so it can redraw without polling
+        # (with a StateStore, Playback subscribes to its own fields instead)
+        if self.playback and self.playback.running and not self.state_store:
+            self.playback.update_state(state)
+
         if self.is_playing:
             # Cancel any pending stop delay if playback resumes
             if self.stop_delay_timer and self.stop_delay_timer.is_alive():
@@ -120,6 +137,12 @@ class ModeManager:
         else:
             print(f"Unhandled mode '{current_mode}' in handle_rotation")
 
+    def adjust_volume(self, volume_change):
+        if self.volume_controller:
+            self.volume_controller.adjust(volume_change)
+        elif self.rotary_control:
+            self.rotary_control.adjust_volume(volume_change)
+
     def handle_button_press(self):
         global last_button_press_time
         current_time = time.time()
@@ -130,21 +153,8 @@ class ModeManager:
             return
 
         last_button_press_time = current_time
-        button_pressed_time = time.time()
-
-        # Detect if the button is held down
-        while GPIO.input(self.rotary_control.SW_PIN) == GPIO.LOW:
-            time.sleep(0.1)
-            if time.time() - button_pressed_time > 1.5:
-                print("Long button press detected: Switching to clock mode.")
-                if self.current_mode != "clock":
-                    self.set_mode("clock")
-                while GPIO.input(self.rotary_control.SW_PIN) == GPIO.LOW:
-                    time.sleep(0.1)
-                print("Button released; remaining in clock mode.")
-                return
 
-        # Regular short press actions
+        # Regular short press actions (RotaryControl reports long presses separately)
         current_mode = self.get_mode()
         print(f"Button short-pressed in mode: {current_mode}")
         if current_mode == "menu":
@@ -161,6 +171,17 @@ class ModeManager:
         else:
             print("Button short-press in unrecognized mode.")
 
+    def handle_long_press(self):
+        # In a station or playlist list the first long press turns the rotary into a letter jump;
+        # a long press while letter-jumping (or anywhere else) goes back to the clock
+        list_manager = {"webradio": self.radio_manager, "playlist": self.playlist_manager}.get(self.current_mode)
+        if list_manager and list_manager.start_letter_jump():
+            print("Long button press detected: Letter jump mode.")
+            return
+        print("Long button press detected: Switching to clock mode.")
+        if self.current_mode != "clock":
+            self.set_mode("clock")
+
     def _exit_current_mode(self):
         if self.current_mode == "clock" and self.clock.running:
             self.clock.stop()
@@ -192,8 +213,16 @@ class ModeManager:
             self.playlist_manager.start_playlist_mode()
 
     def start_playback(self, playback_state):
+        # Playback is long-lived: it is built once and then only started and stopped
         if not self.playback:
-            self.playback = Playback(self.oled, playback_state, self)
+            socket_io = self.volumio_listener.socketIO if self.volumio_listener else None
+            self.playback = Playback(
+                self.oled, playback_state, self,
+                state_store=self.state_store, album_art_fetcher=self.album_art_fetcher,
+                socketIO=socket_io, volumio_listener=self.volumio_listener
+            )
+        else:
+            self.playback.update_state(playback_state)
         if not self.playback.running:
             self.playback.start()
             print("Playback mode started.")
@@ -202,7 +231,6 @@ class ModeManager:
     def stop_playback(self):
         if self.playback and self.playback.running:
             self.playback.stop()
-            self.playback = None
             self.is_playing = False
             print("Playback mode stopped.")
 
@@ -1,27 +1,26 @@
 import time
 import threading
-import requests
-from PIL import Image, ImageDraw, ImageFont
-from luma.core.interface.serial import spi
-from luma.oled.device import ssd1322
-from socketIO_client_nexus import SocketIO, LoggingNamespace
-import os
-from io import BytesIO
-
-from PIL import Image
-import requests
-from io import BytesIO
+from PIL import Image, ImageDraw
+from volumio_socket import get_socket
+from album_art_cache import AlbumArtFetcher
+from glyph_atlas import get_glyph_atlas
+from text_cache import get_text_cache
+from resources import get_font, get_icon, DSEG7, OPEN_SANS
+from volumio_client import get_client
 
 class WebRadio:
-    def __init__(self, device, alt_font, alt_font_medium, local_album_art_path="/home/volumio/Quadify/icons/webradio.bmp"):
+    def __init__(self, device, alt_font, alt_font_medium, local_album_art_icon="webradio", album_art_fetcher=None,
+                 text_cache=None):
         self.device = device
         self.alt_font = alt_font
         self.alt_font_medium = alt_font_medium
-        self.local_album_art_path = local_album_art_path  # Local fallback image path
+        self.text_cache = text_cache or get_text_cache()
+        self.local_album_art_icon = local_album_art_icon  # Local fallback icon name
+        self.album_art_fetcher = album_art_fetcher or AlbumArtFetcher()
 
         # Load the local BMP fallback album art once during initialization
         try:
-            self.default_album_art = Image.open(self.local_album_art_path).resize((40, 40)).convert("RGBA")
+            self.default_album_art = get_icon(self.local_album_art_icon, (40, 40), "RGBA")
         except IOError:
             print("Local BMP album art not found. Please check the path.")
             self.default_album_art = None
@@ -34,30 +33,16 @@ class WebRadio:
         webradio_y_position = 15 if bitrate else 25  # Move down if no bitrate
 
         # Draw the "Webradio" label at the calculated position
-        draw.text((self.device.width // 2, webradio_y_position), "Webradio", font=self.alt_font_medium, fill="white", anchor="mm")
+        self.text_cache.draw_text(base_image, (self.device.width // 2, webradio_y_position), "Webradio", self.alt_font_medium, fill="white", anchor="mm")
 
         # Display bitrate if available
         if bitrate:
-            draw.text((self.device.width // 2, 35), bitrate, font=self.alt_font, fill="white", anchor="mm")
+            self.text_cache.draw_text(base_image, (self.device.width // 2, 35), bitrate, self.alt_font, fill="white", anchor="mm")
 
-        # Attempt to load album art from URL
+        # Never block on the network here: use cached art or the fallback until the fetch lands
         album_art_url = data.get("albumart")
-        album_art = None
+        album_art = self.album_art_fetcher.get_nowait(album_art_url) if album_art_url else None
 
-        if album_art_url:
-            try:
-                response = requests.get(album_art_url)
-                # Check if response contains image data
-                if response.headers["Content-Type"].startswith("image"):
-                    album_art = Image.open(BytesIO(response.content)).resize((60, 60)).convert("RGBA")
-                else:
-                    print("Album art URL did not return an image.")
-                    
-            except requests.RequestException:
-                print("Could not load album art (network error).")
-            except (PIL.UnidentifiedImageError, IOError):
-                print("Could not load album art (unsupported format).")
-        
         # Use the local BMP fallback if URL fetching fails
         if album_art is None and self.default_album_art:
             album_art = self.default_album_art
@@ -68,49 +53,50 @@ class WebRadio:
 
 
 class Playback:
-    def __init__(self, device, state, mode_manager, host='localhost', port=3000):
+    # State fields that affect what is drawn; a frame is only rendered when one of these changes
+    DISPLAY_FIELDS = ("service", "volume", "samplerate", "bitdepth", "trackType", "bitrate", "albumart")
+    RECONCILE_INTERVAL = 30  # Seconds between fallback getState polls
+
+    def __init__(self, device, state, mode_manager, host='localhost', port=3000, state_store=None, album_art_fetcher=None, socketIO=None, volumio_listener=None):
         self.device = device
-        self.state = state
+        self.state = state or {}
         self.mode_manager = mode_manager
+        self.state_store = state_store
         self.host = host
         self.port = port
         self.running = False
-        self.VOL_API_URL = "http://localhost:3000/api/v1/getState"
         self.previous_service = None
-        self.socketIO = SocketIO(self.host, self.port, LoggingNamespace)
+        self.update_thread = None
+        self.state_lock = threading.Lock()
+        self.state_event = threading.Event()  # Set whenever a new state is pushed
+        self.last_rendered_key = None
+        self.last_reconcile_time = 0
+        self.socketIO = socketIO  # Shared connection; only opened here if none was provided
+        self.volumio_listener = volumio_listener  # Reconciled states go through its pushState path
 
-        font_path = "/home/volumio/Quadify/DSEG7Classic-Light.ttf"
-        alt_font_path = "/home/volumio/Quadify/OpenSans-Regular.ttf"
         try:
-            self.large_font = ImageFont.truetype(font_path, 45)
-            self.alt_font_medium = ImageFont.truetype(alt_font_path, 18)
-            self.alt_font = ImageFont.truetype(alt_font_path, 12)
+            self.large_font = get_font(DSEG7, 45)
+            self.alt_font_medium = get_font(OPEN_SANS, 18)
+            self.alt_font = get_font(OPEN_SANS, 12)
         except IOError:
             print("Font file not found. Please check the font paths.")
             exit()
+        self.large_digits = get_glyph_atlas(self.large_font)  # Pre-rendered DSEG7 digits
+        self.text_cache = get_text_cache()  # Shared with the menus
 
         self.icons = {}
         services = ["favourites", "nas", "playlists", "qobuz", "tidal", "webradio", "mpd", "default"]
-        icon_dir = "/home/volumio/Quadify/icons"
         for service in services:
             try:
-                icon_path = os.path.join(icon_dir, f"{service}.bmp")
-                self.icons[service] = Image.open(icon_path).convert("RGB").resize((40, 40))
+                self.icons[service] = get_icon(service, (40, 40), "RGB")
             except IOError:
                 print(f"Icon for {service} not found. Please check the path.")
 
-        self.webradio = WebRadio(self.device, self.alt_font, self.alt_font_medium)
+        self.webradio = WebRadio(self.device, self.alt_font, self.alt_font_medium, album_art_fetcher=album_art_fetcher,
+                                 text_cache=self.text_cache)
 
     def get_volumio_data(self):
-        try:
-            response = requests.get(self.VOL_API_URL)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"Failed to connect to Volumio. Status code: {response.status_code}")
-        except requests.RequestException as e:
-            print(f"Error fetching data from Volumio: {e}")
-        return None
+        return get_client(f"http://{self.host}:{self.port}").get_state()
 
     def get_text_dimensions(self, text, font):
         bbox = font.getbbox(text)
@@ -168,14 +154,14 @@ class Playback:
             unit_y = sample_rate_y + 19
 
             # Draw text for sample rate and unit
-            draw.text((sample_rate_x, sample_rate_y), sample_rate_value, font=self.large_font, fill="white", anchor="mm")
-            draw.text((unit_x, unit_y), sample_rate_unit, font=self.alt_font, fill="white", anchor="lm")
+            self.large_digits.draw_text(image, (sample_rate_x, sample_rate_y), sample_rate_value, fill="white", anchor="mm")
+            self.text_cache.draw_text(image, (unit_x, unit_y), sample_rate_unit, self.alt_font, fill="white", anchor="lm")
 
             # Display audio format and bit depth
             audio_format = data.get("trackType", "Unknown")
             bitdepth = data.get("bitdepth") or "N/A"
             format_bitdepth_text = f"{audio_format}/{bitdepth}"
-            draw.text((210, 45), format_bitdepth_text, font=self.alt_font, fill="white", anchor="mm")
+            self.text_cache.draw_text(image, (210, 45), format_bitdepth_text, self.alt_font, fill="white", anchor="mm")
 
             # Display the icon based on service type
             icon = self.icons.get(current_service, self.icons["default"])
@@ -184,9 +170,45 @@ class Playback:
         # Display the final image on the OLED screen
         self.device.display(image)
 
+    def update_state(self, state):
+        """Hands the latest pushState to the render thread."""
+        if not state:
+            return
+        with self.state_lock:
+            self.state = dict(self.state, **state)
+        self.state_event.set()
+
+    def on_state_fields_changed(self, state, changes):
+        """StateStore subscriber for DISPLAY_FIELDS."""
+        self.update_state(state)
+
+    def on_album_art_ready(self, url, image):
+        """Redraws once background-fetched art for the current station arrives."""
+        with self.state_lock:
+            current_url = self.webradio.album_art_fetcher.resolve_url(self.state.get("albumart"))
+        if self.running and url == current_url:
+            self.last_rendered_key = None
+            self.state_event.set()
+
+    def redraw(self):
+        """Renders a full frame again, e.g. after something else cleared the screen."""
+        if self.running:
+            self.last_rendered_key = None
+            self.state_event.set()
+
+    def get_display_key(self, data):
+        return tuple(data.get(field) for field in self.DISPLAY_FIELDS)
+
     def start(self):
         if not self.running:
             self.running = True
+            self.last_rendered_key = None  # Force a full frame on entry
+            self.last_reconcile_time = time.time()
+            self.state_event.set()
+            self.webradio.album_art_fetcher.add_listener(self.on_album_art_ready)
+            if self.state_store:
+                self.update_state(self.state_store.get_state())
+                self.state_store.subscribe(self.on_state_fields_changed, fields=self.DISPLAY_FIELDS)
             self.update_thread = threading.Thread(target=self.update_display)
             self.update_thread.start()
             print("Playback mode started.")
@@ -194,6 +216,10 @@ class Playback:
     def stop(self):
         if self.running:
             self.running = False
+            self.webradio.album_art_fetcher.remove_listener(self.on_album_art_ready)
+            if self.state_store:
+                self.state_store.unsubscribe(self.on_state_fields_changed)
+            self.state_event.set()  # Wake the render thread so it can exit
             if self.update_thread:
                 self.update_thread.join()
             if self.mode_manager:
@@ -201,16 +227,42 @@ class Playback:
             print("Playback mode stopped and screen cleared.")
 
     def update_display(self):
+        """Renders pushed states, falling back to a slow getState poll to reconcile."""
         while self.running:
-            data = self.get_volumio_data()
-            if data:
+            pushed = self.state_event.wait(timeout=self.RECONCILE_INTERVAL)
+            self.state_event.clear()
+            if not self.running:
+                break
+
+            stale = time.time() - self.last_reconcile_time >= self.RECONCILE_INTERVAL
+            if not pushed or stale or not self.state:
+                self.last_reconcile_time = time.time()
+                data = self.get_volumio_data()
+                if not data:
+                    print("No data received from Volumio.")
+                elif self.volumio_listener:
+                    # Handled like a pushState, so a pending optimistic volume is kept, and delivered
+                    # back here by the store subscription. Not on this thread: a subscriber may switch
+                    # modes, and set_mode joins this thread while holding mode_lock
+                    threading.Thread(target=self.volumio_listener.on_push_state, args=(data,), daemon=True).start()
+                else:
+                    with self.state_lock:
+                        self.state = dict(self.state, **data)
+
+            with self.state_lock:
+                data = dict(self.state)
+            if not data:
+                continue
+
+            display_key = self.get_display_key(data)
+            if display_key != self.last_rendered_key:
                 self.draw_display(data)
-            else:
-                print("No data received from Volumio.")
-            time.sleep(1)
+                self.last_rendered_key = display_key
 
 
     def toggle_play_pause(self):
         # Emit the play/pause command to Volumio
         print("Toggling play/pause")
+        if self.socketIO is None:
+            self.socketIO = get_socket(self.host, self.port)
         self.socketIO.emit('toggle')
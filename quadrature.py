@@ -0,0 +1,95 @@
+import time
+
+# Encoder state is (CLK << 1) | DT. Both lines idle high, so detents sit at 0b11.
+# Clockwise runs 11 -> 01 -> 00 -> 10 -> 11, counter-clockwise the reverse.
+REST_STATE = 0b11
+
+# Indexed by (previous_state << 2) | current_state: +1 clockwise, -1 counter-clockwise, 0 otherwise.
+# Transitions where both lines changed at once (previous ^ current == 0b11) are invalid and also map to 0.
+TRANSITIONS = (
+    0, -1, 1, 0,
+    1, 0, 0, -1,
+    -1, 0, 0, 1,
+    0, 1, -1, 0,
+)
+
+# (maximum seconds between detents, step multiplier), fastest first
+ACCELERATION = ((0.025, 8), (0.05, 4), (0.1, 2))
+
+class QuadratureDecoder:
+    """
+    Full-state quadrature decoder for a detented rotary encoder.
+
+    Every valid Gray-code transition moves a position counter by one; a detent is reported when the
+    encoder settles back in its rest state having travelled at least half a cycle, so a single missed
+    or bounced edge neither loses nor invents a step. No time-based debounce is needed. Timestamps are
+    only used for acceleration: `multiplier()` grows while detents follow each other quickly in the
+    same direction. The decoder has no GPIO dependency and can be fed recorded traces directly.
+    """
+
+    def __init__(self, initial_state=REST_STATE, acceleration=ACCELERATION):
+        self.state = initial_state
+        self.acceleration = acceleration
+        self.position = 0  # Quarter steps travelled since the last rest state
+        self.last_direction = 0
+        self.last_detent_time = None
+        self.interval = None  # Seconds between the last two detents in the same direction
+        self.invalid_transitions = 0
+
+    def update(self, state, timestamp=None):
+        """Feeds one sampled state. Returns +1 or -1 when a detent completes, otherwise 0."""
+        previous, self.state = self.state, state
+        if previous == state:
+            return 0
+        if previous ^ state == 0b11:
+            # Both lines changed: an edge was missed, so the direction is unknown
+            self.invalid_transitions += 1
+        else:
+            self.position += TRANSITIONS[(previous << 2) | state]
+
+        if state != REST_STATE:
+            return 0
+        position, self.position = self.position, 0
+        if abs(position) < 2:
+            return 0  # Bounced back to the detent it started from
+
+        direction = 1 if position > 0 else -1
+        self._record_detent(direction, time.time() if timestamp is None else timestamp)
+        return direction
+
+    def _record_detent(self, direction, timestamp):
+        if direction == self.last_direction and self.last_detent_time is not None:
+            self.interval = timestamp - self.last_detent_time
+        else:
+            self.interval = None  # Reversing always starts slow
+        self.last_direction = direction
+        self.last_detent_time = timestamp
+
+    def multiplier(self):
+        """Step multiplier for the most recent detent, based on how quickly it followed the previous one."""
+        if self.interval is None:
+            return 1
+        for max_interval, factor in self.acceleration:
+            if self.interval <= max_interval:
+                return factor
+        return 1
+
+    def reset(self, state=REST_STATE):
+        self.state = state
+        self.position = 0
+        self.last_direction = 0
+        self.last_detent_time = None
+        self.interval = None
+
+def decode_trace(trace, accelerate=False, **kwargs):
+    """
+    Decodes a recorded list of (timestamp, state) samples and returns the steps reported, e.g. for tests.
+    With `accelerate`, each step is multiplied by the acceleration factor in effect at that detent.
+    """
+    decoder = QuadratureDecoder(**kwargs)
+    steps = []
+    for timestamp, state in trace:
+        direction = decoder.update(state, timestamp)
+        if direction:
+            steps.append(direction * decoder.multiplier() if accelerate else direction)
+    return steps
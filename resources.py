@@ -0,0 +1,38 @@
+import os
+import threading
+from PIL import Image, ImageFont
+
+BASE_DIR = "/home/volumio/Quadify"
+ICON_DIR = os.path.join(BASE_DIR, "icons")
+
+OPEN_SANS = "OpenSans-Regular.ttf"
+DSEG7 = "DSEG7Classic-Light.ttf"
+
+_fonts = {}
+_icons = {}
+_lock = threading.Lock()
+
+def get_font(font_name, size):
+    """
+    Returns the shared FreeType font for (font_name, size), loading it on first use.
+    Raises IOError if the font file cannot be loaded, like ImageFont.truetype.
+    """
+    key = (font_name, size)
+    with _lock:
+        font = _fonts.get(key)
+        if font is None:
+            font = _fonts[key] = ImageFont.truetype(os.path.join(BASE_DIR, font_name), size)
+        return font
+
+def get_icon(name, size=(40, 40), mode="RGB"):
+    """
+    Returns the shared icons/<name>.bmp image, already converted to `mode` and resized to `size`.
+    Raises IOError if the icon cannot be loaded. Callers must not modify the returned image.
+    """
+    key = (name, tuple(size), mode)
+    with _lock:
+        icon = _icons.get(key)
+        if icon is None:
+            with Image.open(os.path.join(ICON_DIR, f"{name}.bmp")) as img:
+                icon = _icons[key] = img.convert(mode).resize(size)
+        return icon
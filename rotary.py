@@ -1,26 +1,39 @@
 import RPi.GPIO as GPIO
 import time
-import requests  # Import to make HTTP requests for volume control
+import queue
+import threading
+from volumio_client import get_client  # Shared HTTP client for volume control
+from quadrature import QuadratureDecoder
 
 class RotaryControl:
     LEFT = 1
     RIGHT = 2
 
-    def __init__(self, clk_pin=13, dt_pin=5, sw_pin=6, debounce_delay=0.01, rotation_callback=None, button_callback=None, mode_manager=None):
+    LONG_PRESS_TIME = 1.5  # Seconds the button must be held for a long press
+    BUTTON_DEBOUNCE = 0.5  # Minimum seconds between two accepted presses
+
+    def __init__(self, clk_pin=13, dt_pin=5, sw_pin=6, rotation_callback=None, button_callback=None, mode_manager=None, state_store=None, volume_controller=None, long_press_callback=None):
         # Initialize GPIO pins
         self.CLK_PIN = clk_pin
         self.DT_PIN = dt_pin
         self.SW_PIN = sw_pin
         self.rotation_callback = rotation_callback  # Callback for rotation events
         self.button_callback = button_callback  # Callback for button press
-        self.debounce_delay = debounce_delay
-        self.direction = None
-        self.last_state = 0b11  # Initial state of (CLK, DT) as binary
-        self.last_rotation_time = time.time()
+        self.long_press_callback = long_press_callback  # Callback for a held button
+        self.decoder = QuadratureDecoder()  # Table-driven; replaces the time-based rotation debounce
         self.last_button_press_time = 0  # Initialize last button press time for debounce
         self.mode_manager = mode_manager
-
-        self.VOL_API_URL = "http://localhost:3000/api/v1/commands/?cmd=volume&volume="  # URL to control Volumio volume
+        self.state_store = state_store  # Shared StateStore; avoids a getState round trip per detent
+        self.volume_controller = volume_controller  # Optimistic, coalesced volume commands
+
+        # GPIO callbacks only timestamp raw edges into this queue; the dispatcher thread decodes them
+        self.events = queue.SimpleQueue()
+        self.pressed_at = None  # Time the button went down, None while released
+        self.press_deadline = None  # When a press is next checked: long press, or a release edge that never came
+        self.long_press_fired = False
+        self.running = True
+        self.dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self.dispatcher.start()
 
         self.setup_gpio()
 
@@ -47,86 +60,143 @@ class RotaryControl:
             pass
 
         # Interrupt-based detection for rotary encoder rotation
-        GPIO.add_event_detect(self.CLK_PIN, GPIO.BOTH, callback=self.handle_rotation)
-        GPIO.add_event_detect(self.DT_PIN, GPIO.BOTH, callback=self.handle_rotation)
-
-        # Button press detection
-        GPIO.add_event_detect(self.SW_PIN, GPIO.FALLING, callback=self._handle_button_press_internal, bouncetime=1000)
-
-    def handle_rotation(self, channel):
-        current_time = time.time()
-        if current_time - self.last_rotation_time < self.debounce_delay:
-            return  # Ignore if this event occurred too soon after the last one
-
-        self.last_rotation_time = current_time
-
-        # Read the current states of CLK and DT
-        clk_state = GPIO.input(self.CLK_PIN)
-        dt_state = GPIO.input(self.DT_PIN)
-        current_state = (clk_state << 1) | dt_state
-
-        # Detect direction based on specific transitions
-        direction_value = None
-        if self.last_state == 0b11:  # Both CLK and DT are high
-            if current_state == 0b01:  # Clockwise
-                direction_value = 1
-                print("Rotary turned clockwise (down).")
-            elif current_state == 0b10:  # Counterclockwise
-                direction_value = -1
-                print("Rotary turned counterclockwise (up).")
-
-            # If we have a valid direction, handle the rotation based on the current mode
-            if direction_value is not None and self.mode_manager:
-                current_mode = self.mode_manager.get_mode()
-                print(f"Current mode: {current_mode}")
-
-                # Call the rotation callback with the direction value
-                if current_mode in ["menu", "webradio", "playlist"] and self.rotation_callback:
-                    self.rotation_callback(direction_value)
-                elif current_mode == "playback":
-                    # Adjust volume in playback mode
-                    volume_change = 15 if direction_value == 1 else -15
-                    self.adjust_volume(volume_change)
+        GPIO.add_event_detect(self.CLK_PIN, GPIO.BOTH, callback=self._on_rotation_edge)
+        GPIO.add_event_detect(self.DT_PIN, GPIO.BOTH, callback=self._on_rotation_edge)
+
+        # Both button edges are needed to time long presses; the dispatcher debounces presses
+        GPIO.add_event_detect(self.SW_PIN, GPIO.BOTH, callback=self._on_button_edge, bouncetime=20)
+
+    def _on_rotation_edge(self, channel):
+        # Runs on RPi.GPIO's callback thread: sample the pins and return straight away
+        current_state = (GPIO.input(self.CLK_PIN) << 1) | GPIO.input(self.DT_PIN)
+        self.events.put((time.time(), "rotate", current_state))
+
+    def _on_button_edge(self, channel):
+        self.events.put((time.time(), "button", GPIO.input(self.SW_PIN)))
+
+    def _dispatch_loop(self):
+        while self.running:
+            timeout = None
+            if self.press_deadline is not None:
+                timeout = max(0, self.press_deadline - time.time())
+            try:
+                event = self.events.get(timeout=timeout)
+            except queue.Empty:
+                try:
+                    self._handle_long_press()
+                except Exception as e:
+                    print(f"Error handling rotary long press: {e}")
+                continue
+            if event is None:
+                break  # Sentinel from stop()
+
+            timestamp, kind, value = event
+            try:
+                if kind == "rotate":
+                    self.handle_rotation(timestamp, value)
                 else:
-                    print(f"Unhandled mode '{current_mode}' in handle_rotation")
-
-        self.last_state = current_state
+                    self._handle_button_edge(timestamp, value)
+            except Exception as e:
+                print(f"Error handling rotary {kind} event: {e}")
+
+    def handle_rotation(self, current_time, current_state):
+        """Decodes one sampled (CLK, DT) state taken at `current_time`."""
+        direction_value = self.decoder.update(current_state, current_time)
+        if not direction_value:
+            return
+        print("Rotary turned clockwise (down)." if direction_value == 1 else "Rotary turned counterclockwise (up).")
+
+        # Handle the rotation based on the current mode
+        if self.mode_manager:
+            current_mode = self.mode_manager.get_mode()
+            print(f"Current mode: {current_mode}")
+
+            # Lists get the accelerated step count so a fast spin jumps through long lists
+            if current_mode in ["menu", "webradio", "playlist"] and self.rotation_callback:
+                self.rotation_callback(direction_value * self.decoder.multiplier())
+            elif current_mode == "playback":
+                # Adjust volume in playback mode
+                volume_change = 15 if direction_value == 1 else -15
+                self.adjust_volume(volume_change)
+            else:
+                print(f"Unhandled mode '{current_mode}' in handle_rotation")
 
 
     def adjust_volume(self, volume_change):
         """Adjusts the volume by the specified amount (+/- 15%). Only call this in playback mode."""
-        try:
-            response = requests.get("http://localhost:3000/api/v1/getState")
-            if response.status_code == 200:
-                data = response.json()
-                current_volume = data.get("volume", 0) or 0  # Set to 0 if unavailable
-                new_volume = max(0, min(100, current_volume + volume_change))
-                requests.get(f"{self.VOL_API_URL}{new_volume}")
-                print(f"Volume adjusted to: {new_volume}%")
-            else:
-                print(f"Failed to get current volume from Volumio. Status code: {response.status_code}")
-        except requests.RequestException as e:
-            print(f"Error adjusting volume: {e}")
-
-    def _handle_button_press_internal(self, channel):
-        current_time = time.time()
-
-        # Check if enough time has passed since the last button press to consider this a valid new press
-        debounce_threshold = 0.5  # 500 milliseconds debounce
-        if current_time - self.last_button_press_time < debounce_threshold:
-            print("Button press ignored due to debounce.")
+        if self.volume_controller:
+            # Returns immediately; the command is sent from the controller's own thread
+            self.volume_controller.adjust(volume_change)
             return
 
-        # Update the last button press time
-        self.last_button_press_time = current_time
+        client = get_client()
+        if self.state_store and self.state_store.get("volume") is not None:
+            current_volume = self.state_store.get("volume", 0)
+        else:
+            data = client.get_state()
+            if not data:
+                print("Failed to get current volume from Volumio.")
+                return
+            current_volume = data.get("volume", 0) or 0  # Set to 0 if unavailable
+
+        new_volume = max(0, min(100, current_volume + volume_change))
+        if client.set_volume(new_volume):
+            print(f"Volume adjusted to: {new_volume}%")
+
+    def _handle_button_edge(self, current_time, level):
+        if level == GPIO.LOW:
+            if self.pressed_at is not None:
+                return  # Already down
+
+            # Check if enough time has passed since the last button press to consider this a valid new press
+            if current_time - self.last_button_press_time < self.BUTTON_DEBOUNCE:
+                print("Button press ignored due to debounce.")
+                return
+
+            self.last_button_press_time = current_time
+            self.pressed_at = current_time
+            self.long_press_fired = False
+            # The dispatcher wakes up at the deadline if no release arrives first, which also
+            # recovers from a release edge lost to the bouncetime
+            self.press_deadline = current_time + self.LONG_PRESS_TIME
+            print("Button pressed.")  # Debug print to confirm button press
+            return
 
-        print("Button pressed.")  # Debug print to confirm button press
+        if self.pressed_at is None:
+            return  # Release of an ignored press
+        self.pressed_at = None
+        self.press_deadline = None
+        if self.long_press_fired:
+            print("Button released after long press.")
+            return
 
         # Delegate button press action to the button callback provided by main.py
         if self.button_callback:
             self.button_callback()
 
+    def _handle_long_press(self):
+        self.press_deadline = None
+        if GPIO.input(self.SW_PIN) != GPIO.LOW:
+            # Released, but the edge was lost (bouncetime can swallow it)
+            self.pressed_at = None
+            if self.long_press_fired:
+                print("Button release after long press missed; button is up again.")
+            else:
+                print("Button release missed; treating it as a short press.")
+                if self.button_callback:
+                    self.button_callback()
+            return
+
+        # Still held: keep checking so a lost release is noticed even after the long press
+        self.press_deadline = time.time() + self.LONG_PRESS_TIME
+        if self.long_press_fired or not self.long_press_callback:
+            return
+        self.long_press_fired = True
+        self.long_press_callback()
+
     def stop(self):
+        self.running = False
+        self.events.put(None)
         GPIO.remove_event_detect(self.CLK_PIN)
         GPIO.remove_event_detect(self.DT_PIN)
         GPIO.remove_event_detect(self.SW_PIN)
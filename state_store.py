@@ -0,0 +1,64 @@
+import threading
+
+_MISSING = object()
+
+class StateStore:
+    """
+    Holds the latest Volumio state in one place and notifies subscribers
+    of the fields that changed on every update.
+    """
+
+    def __init__(self):
+        self.state = {}
+        self.lock = threading.Lock()
+        self.subscribers = []  # List of (callback, fields) tuples; fields=None means all fields
+
+    def subscribe(self, callback, fields=None):
+        """
+        Registers callback(state, changes) to be called when any of the given fields change.
+        `state` is a snapshot of the full state and `changes` maps each changed field to its new value.
+        """
+        if not callable(callback):
+            return
+        fields = frozenset(fields) if fields else None
+        with self.lock:
+            self.subscribers.append((callback, fields))
+        print(f"[StateStore] Subscribed {callback} to fields: {sorted(fields) if fields else 'all'}")
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            self.subscribers = [(cb, fields) for cb, fields in self.subscribers if cb != callback]
+
+    def get(self, field, default=None):
+        with self.lock:
+            value = self.state.get(field, default)
+        return default if value is None else value
+
+    def get_state(self):
+        """Returns a copy of the latest full state."""
+        with self.lock:
+            return dict(self.state)
+
+    def update(self, state):
+        """Merges a new (partial or full) state and notifies interested subscribers. Returns the diff."""
+        if not state:
+            return {}
+
+        with self.lock:
+            changes = {
+                field: value for field, value in state.items()
+                if self.state.get(field, _MISSING) != value
+            }
+            if not changes:
+                return changes
+            self.state.update(state)
+            snapshot = dict(self.state)
+            subscribers = list(self.subscribers)
+
+        for callback, fields in subscribers:
+            if fields is None or not fields.isdisjoint(changes):
+                try:
+                    callback(snapshot, changes)
+                except Exception as e:
+                    print(f"[StateStore] Error in subscriber {callback}: {e}")
+        return changes
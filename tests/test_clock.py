@@ -0,0 +1,68 @@
+import sys
+import time
+import threading
+from pathlib import Path
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from clock import Clock
+
+class RecordingDevice:
+    mode = "RGB"
+    width = 256
+    height = 64
+
+    def __init__(self):
+        self.frames = []  # True for a clock frame, False for a black one
+
+    def display(self, image):
+        self.frames.append(image.getbbox() is not None)
+
+class StopBeforeClearEvent(threading.Event):
+    """An Event whose first clear() on the clock thread lets stop() run just before it, the racy interleaving."""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.stopper = None
+
+    def clear(self):
+        if self.stopper is None and threading.current_thread() is not threading.main_thread():
+            self.stopper = threading.Thread(target=self.clock.stop, daemon=True)
+            self.stopper.start()
+            self.wait(2)  # stop() has set running=False and signalled the event
+        super().clear()
+
+def make_clock(device):
+    # Skips __init__, which loads the fonts from the Pi's install directory
+    clock = Clock.__new__(Clock)
+    clock.device = device
+    clock.running = False
+    clock.update_thread = None
+    clock.stop_event = StopBeforeClearEvent(clock)
+    clock.draw_clock = lambda: device.display(Image.new(device.mode, (device.width, device.height), "white"))
+    return clock
+
+def test_stop_racing_the_update_loop_is_not_lost():
+    device = RecordingDevice()
+    clock = make_clock(device)
+    clock.start()
+
+    deadline = time.time() + 2
+    while not device.frames and time.time() < deadline:
+        time.sleep(0.01)
+    clock.redraw()  # Ends the first minute wait so the loop reaches clear()
+
+    deadline = time.time() + 2
+    while clock.stop_event.stopper is None and time.time() < deadline:
+        time.sleep(0.01)
+    stopper = clock.stop_event.stopper
+    assert stopper is not None
+    stopper.join(timeout=2)
+    assert not stopper.is_alive(), "stop() blocked on the clock thread"
+    assert not clock.update_thread.is_alive()
+
+    time.sleep(0.05)
+    # One clock frame, then stop()'s black screen; nothing painted after the stop
+    assert device.frames == [True, False]
@@ -0,0 +1,104 @@
+import math
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageDraw
+
+class TextCache:
+    """
+    Rendered text strips shared by every screen, so each string is rasterised by FreeType once.
+
+    A strip is the coverage mask font.getmask2() returns for one string, keyed by the text, the font
+    file and size, the anchor and the sub-pixel start. Drawing pastes the strip in the requested colour,
+    which is exactly what ImageDraw.text does with the same mask, so the output is pixel-identical.
+    Strips are evicted least recently used first once `max_bytes` of masks are held.
+    """
+
+    def __init__(self, max_bytes=1024 * 1024, max_entries=2048):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.strips = OrderedDict()  # key -> (mask or None, offset), least recently used first
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _font_key(font):
+        path = getattr(font, "path", None)
+        if path is None or not hasattr(font, "getmask2"):
+            return None  # Bitmap fonts (e.g. ImageFont.load_default()) are drawn directly
+        return (path, getattr(font, "size", None), getattr(font, "index", 0))
+
+    def draw_text(self, image, xy, text, font, fill="white", anchor=None):
+        """Draws `text` onto `image` exactly like ImageDraw.Draw(image).text(xy, text, font=font, ...)."""
+        font_key = self._font_key(font)
+        if font_key is None or not text or "\n" in text or image.mode in ("I", "F"):
+            ImageDraw.Draw(image).text(xy, text, font=font, fill=fill, anchor=anchor)
+            return
+        fx = math.modf(xy[0])[0]
+        fy = math.modf(xy[1])[0]
+        mask, offset = self._strip(font, font_key, text, anchor, fx, fy)
+        if mask is not None:
+            image.paste(fill, (int(xy[0]) + offset[0], int(xy[1]) + offset[1]), mask)
+
+    def _strip(self, font, font_key, text, anchor, fx, fy):
+        key = (text, font_key, anchor, fx, fy)
+        with self.lock:
+            cached = self.strips.get(key)
+            if cached:
+                self.strips.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        core, offset = font.getmask2(text, "L", anchor=anchor, start=(fx, fy))
+        mask = None
+        if core.size[0] and core.size[1]:
+            mask = Image.frombytes("L", core.size, bytes(core))
+        strip = (mask, offset)
+
+        with self.lock:
+            if key not in self.strips:
+                self.strips[key] = strip
+                self.bytes_used += self._size(strip)
+                while self.strips and (self.bytes_used > self.max_bytes or len(self.strips) > self.max_entries):
+                    _, evicted = self.strips.popitem(last=False)
+                    self.bytes_used -= self._size(evicted)
+                    self.evictions += 1
+        return strip
+
+    @staticmethod
+    def _size(strip):
+        mask = strip[0]
+        return mask.size[0] * mask.size[1] if mask is not None else 0
+
+    def clear(self):
+        with self.lock:
+            self.strips.clear()
+            self.bytes_used = 0
+
+    def get_stats(self):
+        """Cache occupancy and hit rate, for monitoring."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.strips),
+                "bytes": self.bytes_used,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+
+_text_cache = None
+_text_cache_lock = threading.Lock()
+
+def get_text_cache():
+    """Returns the process-wide text strip cache, creating it on first use."""
+    global _text_cache
+    with _text_cache_lock:
+        if _text_cache is None:
+            _text_cache = TextCache()
+        return _text_cache
@@ -0,0 +1,114 @@
+import unicodedata
+from collections import defaultdict
+
+def normalize_title(title):
+    """Lowercases, strips accents and collapses punctuation to spaces: "Café-Radio FM" -> "cafe radio fm"."""
+    decomposed = unicodedata.normalize("NFKD", title or "")
+    chars = [c.lower() if c.isalnum() else " " for c in decomposed if not unicodedata.combining(c)]
+    return " ".join("".join(chars).split())
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TitleIndex:
+    """
+    Lookup structure over one listing (stations or playlists), built once when the listing arrives.
+
+    - `position(uri)` resolves an item by URI in O(1).
+    - `letters()` / `first_with_letter()` back the rotary's letter jump; titles starting with a digit
+      or symbol are grouped under "#".
+    - `search(query)` ranks titles by trigram overlap, so typos and partial words still match.
+      Queries are scored against the trigram postings only, never by scanning every title.
+    """
+
+    def __init__(self, items, title=lambda item: item['title'], uri=lambda item: item['uri']):
+        self.items = list(items)
+        self.normalized = [normalize_title(title(item)) for item in self.items]
+        self.positions = {}  # uri -> index of its first occurrence
+        self.letter_positions = {}  # letter -> index of the first title starting with it
+        self.postings = defaultdict(list)  # trigram -> indices of titles containing it
+
+        for index, (item, normalized) in enumerate(zip(self.items, self.normalized)):
+            self.positions.setdefault((uri(item) or "").strip(), index)
+            self.letter_positions.setdefault(self.letter_of(normalized), index)
+            for trigram in _trigrams(normalized):
+                self.postings[trigram].append(index)
+        self.sorted_letters = sorted(self.letter_positions, key=lambda letter: (letter != "#", letter))
+
+    def __len__(self):
+        return len(self.items)
+
+    @staticmethod
+    def letter_of(normalized):
+        first = normalized[:1]
+        return first if first.isalpha() else "#"
+
+    def position(self, uri):
+        """Index of the item with `uri`, or None."""
+        return self.positions.get((uri or "").strip())
+
+    def get(self, uri):
+        """The item with `uri`, or None."""
+        index = self.position(uri)
+        return self.items[index] if index is not None else None
+
+    def letters(self):
+        """Letters that at least one title starts with, "#" first."""
+        return self.sorted_letters
+
+    def first_with_letter(self, letter):
+        return self.letter_positions.get(letter)
+
+    def letter_at(self, index):
+        if not 0 <= index < len(self.items):
+            return None
+        return self.letter_of(self.normalized[index])
+
+    def step_letter(self, index, steps):
+        """
+        Moves `steps` letters on from the letter of the item at `index` (wrapping) and returns
+        (letter, index of the first title with that letter). Returns (None, index) for an empty listing.
+        """
+        if not self.sorted_letters:
+            return None, index
+        current = self.letter_at(index)
+        position = self.sorted_letters.index(current) if current in self.letter_positions else 0
+        letter = self.sorted_letters[(position + steps) % len(self.sorted_letters)]
+        return letter, self.letter_positions[letter]
+
+    def search(self, query, limit=10):
+        """
+        Indices of the best matches for `query`, best first. Exact prefixes rank above substrings,
+        which rank above trigram-only (fuzzy) matches; ties keep listing order.
+        """
+        normalized = normalize_title(query)
+        if not normalized:
+            return []
+        query_trigrams = _trigrams(normalized)
+        scores = defaultdict(int)
+        for trigram in query_trigrams:
+            for index in self.postings.get(trigram, ()):
+                scores[index] += 1
+
+        # A title needs at least half of the query's trigrams to count as a fuzzy match
+        threshold = max(1, len(query_trigrams) // 2)
+        ranked = []
+        for index, shared in scores.items():
+            title = self.normalized[index]
+            if title.startswith(normalized):
+                rank = 2
+            elif normalized in title:
+                rank = 1
+            elif shared >= threshold:
+                rank = 0
+            else:
+                continue
+            ranked.append((-rank, -shared / len(query_trigrams), index))
+        ranked.sort()
+        return [index for _, _, index in ranked[:limit]]
+
+    def find(self, query):
+        """The best match for `query`, or None."""
+        matches = self.search(query, limit=1)
+        return self.items[matches[0]] if matches else None
@@ -0,0 +1,89 @@
+import time
+import threading
+from volumio_client import get_client
+
+class VolumeController:
+    """
+    Optimistic volume control for the rotary encoder.
+
+    Each detent updates a local target volume straight away and publishes it to the StateStore so the
+    volume bars redraw immediately. A worker thread coalesces bursts of detents into a single absolute
+    volume command, sent at most once per `min_interval`. Incoming pushStates are reconciled through
+    `reconcile()`: while a change is in flight the local target wins, afterwards Volumio's value does.
+    """
+
+    def __init__(self, state_store=None, client=None, min_interval=0.15, settle_time=1.5):
+        self.state_store = state_store
+        self.client = client or get_client()
+        self.min_interval = min_interval  # Minimum seconds between volume commands
+        self.settle_time = settle_time  # How long Volumio may lag behind the last command sent
+        self.target = None  # Optimistic local volume; None when in sync with Volumio
+        self.pending = False  # Target changed since the last command was sent
+        self.last_sent_time = 0
+        self.last_sent_volume = None
+        self.condition = threading.Condition()
+        self.worker = threading.Thread(target=self._send_loop, daemon=True)
+        self.worker.start()
+
+    def get_volume(self):
+        with self.condition:
+            if self.target is not None:
+                return self.target
+        return self.state_store.get("volume", 0) if self.state_store else 0
+
+    def adjust(self, volume_change):
+        """Applies a relative change locally and schedules the command. Returns the new target volume."""
+        with self.condition:
+            base = self.target
+            if base is None:
+                base = self.state_store.get("volume", 0) if self.state_store else 0
+            self.target = max(0, min(100, base + volume_change))
+            self.pending = True
+            target = self.target
+            self.condition.notify()
+
+        if self.state_store:
+            self.state_store.update({"volume": target})
+        return target
+
+    def set_volume(self, volume):
+        """Sets an absolute target volume."""
+        return self.adjust(volume - self.get_volume())
+
+    def reconcile(self, state):
+        """Returns `state` with the optimistic volume applied while a local change is still in flight."""
+        if not state or "volume" not in state:
+            return state
+        with self.condition:
+            if self.target is None:
+                return state
+            if state.get("volume") == self.target and not self.pending:
+                self.target = None  # Volumio caught up
+                self.last_sent_volume = None
+                return state
+            if self.pending or time.time() - self.last_sent_time < self.settle_time:
+                return dict(state, volume=self.target)
+            print(f"[VolumeController] Volumio reports {state.get('volume')}% instead of {self.target}%; accepting it.")
+            self.target = None
+            self.last_sent_volume = None
+            return state
+
+    def _send_loop(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                wait = self.min_interval - (time.time() - self.last_sent_time)
+                if wait > 0:
+                    # Rate limit; more detents arriving now are folded into the same command
+                    self.condition.wait(wait)
+                    continue
+                volume = self.target
+                self.pending = False
+                if volume is None or volume == self.last_sent_volume:
+                    continue  # e.g. more detents past 0% or 100%
+                self.last_sent_time = time.time()
+                self.last_sent_volume = volume
+
+            if self.client.set_volume(volume):
+                print(f"Volume adjusted to: {volume}%")
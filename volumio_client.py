@@ -0,0 +1,134 @@
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+BASE_URL = "http://localhost:3000"
+
+class VolumioClient:
+    """
+    Shared HTTP client for Volumio's REST API.
+
+    One keep-alive Session is reused for every call, every request has connect/read timeouts so a
+    hung backend cannot block a GPIO callback thread, and failures are retried a bounded number of
+    times with jittered exponential backoff. Per-endpoint latency is recorded in `metrics`.
+    """
+
+    def __init__(self, base_url=BASE_URL, connect_timeout=1.0, read_timeout=3.0, max_retries=2, backoff=0.1):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.metrics = {}  # endpoint -> {count, errors, retries, total_ms, max_ms, last_ms}
+        self.lock = threading.Lock()
+
+    def get(self, path, params=None, idempotent=True):
+        """
+        GETs `path` and returns the Response. Requests that never reached Volumio (connect timeout,
+        connection refused) are always retried; other connection errors, read timeouts and 5xx replies
+        only for idempotent requests, since the command may already have run.
+        Raises requests.RequestException.
+        """
+        endpoint = path if not params or "cmd" not in params else f"{path}?cmd={params['cmd']}"
+        url = self.base_url + path
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                if response.status_code >= 500:
+                    response.raise_for_status()
+                self._record(endpoint, start, error=False, retried=attempt > 0)
+                return response
+            except requests.RequestException as e:
+                self._record(endpoint, start, error=True, retried=attempt > 0)
+                if self._never_sent(e):
+                    retryable = True
+                else:
+                    retryable = idempotent and isinstance(e, (requests.ConnectionError, requests.Timeout,
+                                                              requests.HTTPError))
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                time.sleep(self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+
+    @staticmethod
+    def _never_sent(error):
+        """True if `error` happened before the request could reach Volumio."""
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        if not isinstance(error, requests.ConnectionError):
+            return False
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, (NewConnectionError, ConnectionRefusedError))
+
+    def get_state(self):
+        """Returns the current Volumio state as a dict, or None if it could not be fetched."""
+        try:
+            response = self.get("/api/v1/getState")
+            if response.status_code == 200:
+                return response.json()
+            print(f"Failed to get Volumio state. Status code: {response.status_code}")
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error fetching data from Volumio: {e}")
+        return None
+
+    def send_command(self, cmd, **params):
+        """Sends /api/v1/commands/?cmd=<cmd>. Returns True on success."""
+        params = dict(params, cmd=cmd)
+        try:
+            response = self.get("/api/v1/commands/", params=params, idempotent=False)
+            if response.status_code == 200:
+                return True
+            print(f"Volumio command '{cmd}' failed. Status code: {response.status_code}")
+        except requests.RequestException as e:
+            print(f"Error sending Volumio command '{cmd}': {e}")
+        return False
+
+    def set_volume(self, volume):
+        """Sets an absolute volume (0-100). Safe to retry, unlike relative commands."""
+        params = {"cmd": "volume", "volume": volume}
+        try:
+            response = self.get("/api/v1/commands/", params=params, idempotent=True)
+            return response.status_code == 200
+        except requests.RequestException as e:
+            print(f"Error adjusting volume: {e}")
+        return False
+
+    def _record(self, endpoint, start, error, retried):
+        elapsed_ms = (time.monotonic() - start) * 1000
+        with self.lock:
+            stats = self.metrics.setdefault(endpoint, {
+                "count": 0, "errors": 0, "retries": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0
+            })
+            stats["count"] += 1
+            stats["errors"] += int(error)
+            stats["retries"] += int(retried)
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["last_ms"] = elapsed_ms
+
+    def get_metrics(self):
+        """Returns a copy of the per-endpoint metrics with the average latency filled in."""
+        with self.lock:
+            metrics = {endpoint: dict(stats) for endpoint, stats in self.metrics.items()}
+        for stats in metrics.values():
+            stats["avg_ms"] = stats["total_ms"] / stats["count"] if stats["count"] else 0.0
+        return metrics
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(base_url=BASE_URL):
+    """Returns the process-wide client for `base_url`."""
+    with _clients_lock:
+        client = _clients.get(base_url)
+        if client is None:
+            client = _clients[base_url] = VolumioClient(base_url)
+        return client
@@ -1,13 +1,22 @@
-import requests
-from socketIO_client_nexus import SocketIO, LoggingNamespace
+import time
 import threading
+from collections import OrderedDict
+from concurrent.futures import Future
 from PIL import Image
+from volumio_client import get_client
+from volumio_socket import get_socket
+from title_index import TitleIndex
 
 class VolumioListener:
-    def __init__(self, host='localhost', port=3000, on_state_change_callback=None, oled=None, clock=None, mode_manager=None):
+    BROWSE_TIMEOUT = 15  # Seconds before an unanswered browseLibrary request is failed
+
+    def __init__(self, host='localhost', port=3000, on_state_change_callback=None, oled=None, clock=None, mode_manager=None, state_store=None, volume_controller=None, socket=None, listing_cache=None):
         self.host = host
         self.port = port
         self.on_state_change_callback = on_state_change_callback
+        self.state_store = state_store  # Shared StateStore fed by every pushState
+        self.volume_controller = volume_controller  # Keeps optimistic rotary volume until Volumio catches up
+        self.listing_cache = listing_cache  # Optional persistent ListingCache for browseLibrary replies
         self.oled = oled
         self.clock = clock
         self.mode_manager = mode_manager
@@ -19,9 +28,16 @@ class VolumioListener:
         # Data storage
         self.playlists = []
         self.webradio_stations = []
+        self.webradio_index = TitleIndex([])  # Rebuilt whenever a webradio listing arrives
+
+        # browseLibrary requests: uri -> [Future, time sent or None while queued], oldest first.
+        # Replies carry no request id, so only one is sent at a time (see _match_browse_request).
+        self.browse_requests = OrderedDict()
+        self.expired_browse_requests = OrderedDict()  # uri -> time it timed out; its reply may still come
+        self.browse_lock = threading.Lock()
 
-        # Initialize SocketIO connection and register event handlers
-        self.socketIO = SocketIO(self.host, self.port, LoggingNamespace)
+        # Register on the shared connection; other components receive the same events from it
+        self.socketIO = socket or get_socket(self.host, self.port)
         print(f"[Debug] Connecting to Volumio WebSocket at {self.host}:{self.port}")
         self._register_socketio_events()
 
@@ -32,27 +48,111 @@ class VolumioListener:
         self.socketIO.on('pushState', self.on_push_state)
         self.socketIO.on('pushQueue', self.on_push_queue)
         self.socketIO.on('pushBrowseLibrary', self.on_receive_browse_library)
+        # Events are re-bound on every new connection by the socket; only our own state needs a resync
+        self.socketIO.add_reconnect_handler(self.on_reconnected)
         print("[Debug] Registered WebSocket events.")
 
+    def on_reconnected(self):
+        """Runs after the shared socket reconnects: drops listings that may be stale and refetches the state."""
+        self.playlists = []
+        self.webradio_stations = []
+        self.webradio_index = TitleIndex([])
+        if self.listing_cache:
+            self.listing_cache.mark_stale()
+        self._fail_browse_requests(lambda uri: True, ConnectionError("Volumio connection was reset"))
+        self.socketIO.emit('getState')
+
+    def get_connection_health(self):
+        """Uptime, reconnect count and last event age of the Volumio connection."""
+        return self.socketIO.get_health()
+
     def get_volumio_state(self):
         """Fetches the current Volumio state."""
-        try:
-            response = requests.get(f"http://{self.host}:{self.port}/api/v1/getState")
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            print(f"Error fetching Volumio state: {e}")
-            return None
+        return get_client(f"http://{self.host}:{self.port}").get_state()
+
+    def browse(self, uri):
+        """
+        Requests the listing at `uri` and returns a Future resolved with its items (see _parse_items).
+        A request for a URI that is already pending returns the same Future instead of a new emit.
+        """
+        with self.browse_lock:
+            pending = self.browse_requests.get(uri)
+            if pending:
+                print(f"[VolumioListener] browseLibrary '{uri}' already pending; sharing its reply.")
+                return pending[0]
+            future = Future()
+            self.browse_requests[uri] = [future, None]
+        self._send_next_browse_request()
+        return future
+
+    def _send_next_browse_request(self):
+        """Emits the oldest queued browseLibrary request, unless one is still waiting for its reply."""
+        with self.browse_lock:
+            if any(sent_at is not None for _, sent_at in self.browse_requests.values()):
+                return
+            uri = next(iter(self.browse_requests), None)
+            if uri is None:
+                return
+            entry = self.browse_requests[uri]
+            entry[1] = time.time()
+        timer = threading.Timer(self.BROWSE_TIMEOUT, self._expire_browse_request, args=(uri, entry[0]))
+        timer.daemon = True
+        timer.start()
+
+        if not self.socketIO.emit('browseLibrary', {'uri': uri}):
+            self._fail_browse_requests(lambda pending_uri: True, ConnectionError("Not connected to Volumio"))
+
+    def _expire_browse_request(self, uri, future):
+        with self.browse_lock:
+            entry = self.browse_requests.get(uri)
+            if not entry or entry[0] is not future:
+                return  # Answered (or failed) in time
+            self.expired_browse_requests[uri] = time.time()
+        self._fail_browse_requests(lambda pending_uri: pending_uri == uri,
+                                   TimeoutError("No browseLibrary reply from Volumio"))
+
+    def browse_cached(self, uri):
+        """
+        Stale-while-revalidate lookup. Returns (cached_items, future): the cached listing (None if there is
+        none) to draw right away, and a Future for a fresh listing (None if the cached one is still fresh).
+        """
+        if not self.listing_cache:
+            return None, self.browse(uri)
+        items, fresh = self.listing_cache.get(uri)
+        if fresh:
+            return items, None
+        return items, self.browse(uri)
+
+    def _fail_browse_requests(self, predicate, error):
+        with self.browse_lock:
+            failed = [(uri, entry) for uri, entry in self.browse_requests.items() if predicate(uri)]
+            for uri, _ in failed:
+                del self.browse_requests[uri]
+        for uri, (future, _) in failed:
+            print(f"[VolumioListener] browseLibrary '{uri}' failed: {error}")
+            future.set_exception(error)
+        self._send_next_browse_request()
 
     def fetch_playlists(self):
-        """Requests playlists from Volumio."""
+        """Requests playlists from Volumio. Returns a Future of the listing's items."""
         print("Fetching playlists from Volumio...")
-        self.socketIO.emit('browseLibrary', {'uri': 'playlists'})
+        return self.browse('playlists')
 
     def fetch_webradio_stations(self, uri="mywebradio"):
-        """Requests webradio stations from Volumio."""
+        """Requests webradio stations from Volumio. Returns a Future of the listing's items."""
         print(f"Fetching webradio stations from Volumio for URI: {uri}")
-        self.socketIO.emit('browseLibrary', {'uri': uri})
+        return self.browse(uri)
+
+    @staticmethod
+    def playlist_items(items):
+        return [{'title': item['title'], 'uri': item['uri']} for item in items if item['type'] == "playlist"]
+
+    @staticmethod
+    def webradio_items(items):
+        return [
+            {'title': item['title'], 'uri': item['uri'], 'albumart': item['albumart'], 'bitrate': item['bitrate']}
+            for item in items if item['type'] in ['webradio', 'mywebradio']
+        ]
 
     def register_playlists_callback(self, callback):
         """Registers a callback to be triggered when playlists are received."""
@@ -94,31 +194,97 @@ class VolumioListener:
         else:
             print("No radio stations found.")
 
+    @staticmethod
+    def _parse_items(data):
+        items = data['navigation']['lists'][0].get('items', []) if data['navigation']['lists'] else []
+        return [
+            {
+                'title': item.get('title', ''),
+                'uri': item.get('uri', ''),
+                'type': item.get('type'),
+                'albumart': item.get('albumart', ''),
+                'bitrate': item.get('bitrate', 0)
+            }
+            for item in items
+        ]
+
+    @staticmethod
+    def _parent_uri(uri):
+        uri = uri.rstrip('/')
+        return uri.rsplit('/', 1)[0] if '/' in uri else '/'
+
+    def _match_browse_request(self, data):
+        """
+        Returns (uri, confident) for the in-flight request that a pushBrowseLibrary reply answers, or
+        (None, False). `confident` is True when the reply names its URI or its parent; a reply matched
+        only because a single request was in flight is delivered but not cached.
+
+        Volumio resolves browseLibrary asynchronously per plugin and its replies carry no request id, so
+        replies are never matched by order. Only one request is in flight at a time, and a reply is only
+        accepted if nothing else could have sent it: a late reply to a request that already timed out
+        could, so replies that fit such a request as well as the in-flight one are discarded.
+        """
+        navigation = data.get('navigation', {})
+        now = time.time()
+        with self.browse_lock:
+            in_flight = next((uri for uri, (_, sent_at) in self.browse_requests.items() if sent_at is not None), None)
+            for uri, expired_at in list(self.expired_browse_requests.items()):
+                if now - expired_at > self.BROWSE_TIMEOUT:
+                    del self.expired_browse_requests[uri]
+            expired = list(self.expired_browse_requests)
+        if in_flight is None:
+            return None, False
+
+        # An explicit URI in the reply decides it
+        explicit = [uri.rstrip('/') for uri in (data.get('uri'), navigation.get('uri'),
+                                                (navigation.get('info') or {}).get('uri')) if uri]
+        if explicit:
+            return (in_flight, True) if in_flight.rstrip('/') in explicit else (None, False)
+
+        # Otherwise the reply's 'prev' link must be the parent of the in-flight URI and of no expired one
+        prev_uri = (navigation.get('prev') or {}).get('uri')
+        if prev_uri:
+            parent = prev_uri.rstrip('/') or '/'
+            candidates = [uri for uri in [in_flight] + expired if self._parent_uri(uri) == parent]
+            if candidates == [in_flight]:
+                return in_flight, True
+            # 'prev' is not always the lexical parent; with nothing else pending the reply is still ours
+            return (None, False) if expired else (in_flight, False)
+
+        # No way to tell the reply apart from a late one
+        return (None, False) if expired else (in_flight, False)
+
     def on_receive_browse_library(self, data):
-        if 'navigation' in data and 'lists' in data['navigation']:
-            items = data['navigation']['lists'][0].get('items', [])
-            playlists, webradio = [], []
-            for item in items:
-                item_type = item.get('type')
-                if item_type == "playlist":
-                    playlists.append({'title': item.get('title', ''), 'uri': item.get('uri', '')})
-                elif item_type in ['webradio', 'mywebradio']:
-                    webradio.append({
-                        'title': item.get('title', ''),
-                        'uri': item.get('uri', ''),
-                        'albumart': item.get('albumart', ''),
-                        'bitrate': item.get('bitrate', 0)
-                    })
-
-            # Assign and callback
-            self.playlists = playlists if playlists else self.playlists
-            self.webradio_stations = webradio if webradio else self.webradio_stations
-            if self.on_playlists_received_callback and playlists:
-                self.on_playlists_received_callback(self.playlists)
-            if self.on_webradio_received_callback and webradio:
-                self.on_webradio_received_callback(self.webradio_stations)
-        else:
+        if not ('navigation' in data and 'lists' in data['navigation']):
             print("[Error] Invalid browseLibrary data received.")
+            return
+
+        uri, confident = self._match_browse_request(data)
+        with self.browse_lock:
+            entry = self.browse_requests.pop(uri, None) if uri else None
+        if entry is None:
+            print("[VolumioListener] Discarding browseLibrary reply that matches no pending request unambiguously.")
+            return
+        future, sent_at = entry
+        items = self._parse_items(data)
+        print(f"[VolumioListener] browseLibrary '{uri}' answered in {(time.time() - sent_at) * 1000:.0f} ms")
+
+        playlists = self.playlist_items(items)
+        webradio = self.webradio_items(items)
+        self.playlists = playlists if playlists else self.playlists
+        if webradio:
+            self.webradio_stations = webradio
+            self.webradio_index = TitleIndex(webradio)
+        if self.listing_cache and confident:
+            self.listing_cache.put(uri, items)
+        future.set_result(items)
+        self._send_next_browse_request()
+
+        # Listeners registered the old way still hear about listings of their kind
+        if self.on_playlists_received_callback and playlists:
+            self.on_playlists_received_callback(self.playlists)
+        if self.on_webradio_received_callback and webradio:
+            self.on_webradio_received_callback(self.webradio_stations)
 
     def play_playlist(self, playlist_name):
         """Sends a request to Volumio to play a specific playlist."""
@@ -126,30 +292,39 @@ class VolumioListener:
         self.socketIO.emit('playPlaylist', {'name': playlist_name})
         print(f"'playPlaylist' event emitted with playlist: {playlist_name}")
 
-    def play_webradio_station(self, title, uri):
-        """Attempts to play a specific webradio station based on title match."""
-        normalized_title = title.strip().lower()
-        for station in self.webradio_stations:
-            if normalized_title in station.get('title', '').strip().lower():
-                print(f"[Playing] Playing webradio station '{station.get('title')}' with URI: {station.get('uri')}")
-                self.socketIO.emit('replaceAndPlay', {
-                    "service": "webradio",
-                    "type": "webradio",
-                    "title": station.get('title'),
-                    "uri": station.get('uri')
-                })
-                return
-        print(f"[Failure] Webradio station '{title}' not found.")
+    def play_webradio_station(self, title, uri=None):
+        """
+        Plays a webradio station. The URI identifies the station directly; a title on its own is
+        looked up with a fuzzy search of the last station listing.
+        """
+        station = None
+        if uri:
+            # The menu may be showing a cached listing this connection has not fetched; the URI is enough
+            station = self.webradio_index.get(uri) or {'title': title, 'uri': uri.strip()}
+        elif title:
+            station = self.webradio_index.find(title)
+        if not station:
+            print(f"[Failure] Webradio station '{title}' not found.")
+            return
+        print(f"[Playing] Playing webradio station '{station.get('title')}' with URI: {station.get('uri')}")
+        self.socketIO.emit('replaceAndPlay', {
+            "service": "webradio",
+            "type": "webradio",
+            "title": station.get('title'),
+            "uri": station.get('uri')
+        })
 
     def connect(self):
         """Starts the Volumio listener in a separate thread."""
-        def listener_thread():
-            print("Starting Volumio listener...")
-            self.socketIO.emit('getState', {}, self.on_push_state)
-            self.socketIO.wait()
-        threading.Thread(target=listener_thread, daemon=True).start()
+        print("Starting Volumio listener...")
+        self.socketIO.start()
+        self.socketIO.emit('getState')  # Answered with a pushState
 
     def on_push_state(self, data):
+        if self.volume_controller:
+            data = self.volume_controller.reconcile(data)
+        if self.state_store:
+            self.state_store.update(data)
         if self.on_state_change_callback:
             self.on_state_change_callback(data)
 
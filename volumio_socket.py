@@ -0,0 +1,217 @@
+import time
+import random
+import threading
+from socketIO_client_nexus import SocketIO, LoggingNamespace
+
+class VolumioSocket:
+    """
+    The one Socket.IO connection to Volumio, shared by every component.
+
+    socketIO_client keeps a single callback per event, so handlers registered with `on()` are kept here
+    and fanned out from one dispatcher per event: each pushState is received and parsed once no matter
+    how many components listen to it. Emits are serialised.
+
+    A supervisor thread receives events and reconnects with jittered exponential backoff when
+    Volumio goes away; handlers added with `add_reconnect_handler()` run after every reconnect so
+    their owners can resync, as does the first connection if Volumio was not up when the socket was
+    created (anything emitted before then was dropped). `get_health()` reports uptime, reconnect
+    count and last event age.
+    """
+    WAIT_SLICE = 1  # Seconds per socketIO.wait() call between connection checks
+
+    def __init__(self, host="localhost", port=3000, base_backoff=1.0, max_backoff=60.0):
+        self.host = host
+        self.port = port
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.handlers = {}  # event -> list of callbacks
+        self.reconnect_handlers = []
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.supervisor = None
+        self.socketIO = None
+        self.was_connected = False
+
+        # Connection health
+        self.connected_since = None
+        self.connect_count = 0
+        self.disconnect_count = 0
+        self.last_event_time = None
+        self.last_error = None
+
+        # Components emit their initial requests once this returns; if Volumio is not up yet those are
+        # dropped, so the supervisor's first successful connection has to resync like a reconnect
+        self.resync_first_connect = not self._open()
+
+    @property
+    def connected(self):
+        return self.socketIO is not None and self.socketIO.connected
+
+    def _open(self):
+        """Opens a new connection and re-registers every event on it. Returns True on success."""
+        self._close()
+        try:
+            socketIO = SocketIO(self.host, self.port, LoggingNamespace, wait_for_connection=False)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"[VolumioSocket] Could not connect to Volumio at {self.host}:{self.port}: {e}")
+            return False
+        with self.lock:
+            # 'disconnect' is always bound so drops that socketIO_client recovers from itself are counted
+            events = set(self.handlers) | {"disconnect"}
+            self.socketIO = socketIO
+        for event in events:
+            self._bind(event)
+        print(f"[VolumioSocket] Connected to Volumio at {self.host}:{self.port}")
+        return True
+
+    def _close(self):
+        """Closes the current connection, if any, so its heartbeat thread and HTTP session do not leak."""
+        with self.lock:
+            socketIO, self.socketIO = self.socketIO, None
+            events = set(self.handlers) | {"disconnect"}
+        if socketIO is None:
+            return
+        try:
+            # Unbound first: the drop was already counted, and its handlers must not fire again
+            for event in events:
+                socketIO.off(event)
+            socketIO.disconnect()
+            http_session = getattr(socketIO, "_http_session", None)  # socketIO_client does not close it
+            if http_session:
+                http_session.close()
+        except Exception as e:
+            print(f"[VolumioSocket] Error closing the previous connection: {e}")
+
+    def _bind(self, event):
+        self.socketIO.on(event, lambda *args: self._dispatch(event, args))
+
+    def on(self, event, handler):
+        """Adds `handler` for `event`; existing handlers for the event keep receiving it."""
+        with self.lock:
+            handlers = self.handlers.setdefault(event, [])
+            first = not handlers
+            handlers.append(handler)
+        if first and self.socketIO is not None:
+            self._bind(event)
+
+    def off(self, event, handler=None):
+        """Removes `handler` (or every handler) for `event`."""
+        with self.lock:
+            handlers = self.handlers.get(event, [])
+            self.handlers[event] = [h for h in handlers if handler is not None and h != handler]
+
+    def add_reconnect_handler(self, handler):
+        """Registers handler() to run on the supervisor thread after each reconnect."""
+        with self.lock:
+            self.reconnect_handlers.append(handler)
+
+    def _dispatch(self, event, args):
+        if event == "disconnect":
+            if self.was_connected:
+                self._mark_disconnected()
+        else:
+            self.last_event_time = time.time()
+        with self.lock:
+            handlers = list(self.handlers.get(event, []))
+        for handler in handlers:
+            try:
+                handler(*args)
+            except Exception as e:
+                print(f"[VolumioSocket] Error in '{event}' handler {handler}: {e}")
+
+    def emit(self, event, *args, **kwargs):
+        """Sends `event`. Returns False (instead of raising) if Volumio is not connected."""
+        if not self.connected:
+            print(f"[VolumioSocket] Not connected; dropping '{event}'")
+            return False
+        try:
+            with self.send_lock:
+                self.socketIO.emit(event, *args, **kwargs)
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"[VolumioSocket] Error sending '{event}': {e}")
+            return False
+
+    def start(self):
+        """Starts the supervisor thread that receives events and reconnects (once)."""
+        with self.lock:
+            if self.supervisor and self.supervisor.is_alive():
+                return
+            self.supervisor = threading.Thread(target=self._supervise, daemon=True)
+            self.supervisor.start()
+
+    def _supervise(self):
+        attempt = 0
+        while True:
+            if not self.connected:
+                self._track_connection()
+                if self.socketIO is None or attempt > 0:
+                    delay = min(self.max_backoff, self.base_backoff * (2 ** min(attempt, 10)))
+                    time.sleep(delay * random.uniform(0.5, 1.0))
+                attempt += 1
+                if not self._open():
+                    continue
+            attempt = 0
+            self._track_connection()
+            try:
+                self.socketIO.wait(seconds=self.WAIT_SLICE)
+            except Exception as e:
+                # Raised when socketIO_client cannot reopen the transport itself; we reconnect instead
+                self.last_error = str(e)
+
+    def _track_connection(self):
+        """Updates the health counters on connect/disconnect transitions and runs reconnect handlers."""
+        connected = self.connected
+        if connected == self.was_connected:
+            return
+        if not connected:
+            self._mark_disconnected()
+            return
+
+        self.was_connected = True
+        self.connected_since = time.time()
+        self.connect_count += 1
+        if self.connect_count == 1:
+            if not self.resync_first_connect:
+                return
+            print("[VolumioSocket] Connected to Volumio after a failed start; resyncing.")
+        else:
+            print(f"[VolumioSocket] Reconnected to Volumio (reconnect #{self.connect_count - 1}); resyncing.")
+        with self.lock:
+            handlers = list(self.reconnect_handlers)
+        for handler in handlers:
+            try:
+                handler()
+            except Exception as e:
+                print(f"[VolumioSocket] Error in reconnect handler {handler}: {e}")
+
+    def _mark_disconnected(self):
+        self.was_connected = False
+        self.disconnect_count += 1
+        self.connected_since = None
+        print("[VolumioSocket] Connection to Volumio lost; reconnecting with backoff.")
+
+    def get_health(self):
+        """Connection health for monitoring; ages and uptime are in seconds (None if not applicable)."""
+        now = time.time()
+        return {
+            "connected": self.connected,
+            "uptime": now - self.connected_since if self.connected_since else None,
+            "reconnects": max(0, self.connect_count - 1),
+            "disconnects": self.disconnect_count,
+            "last_event_age": now - self.last_event_time if self.last_event_time else None,
+            "last_error": self.last_error,
+        }
+
+_sockets = {}
+_sockets_lock = threading.Lock()
+
+def get_socket(host="localhost", port=3000):
+    """Returns the process-wide connection to Volumio at host:port, opening it on first use."""
+    with _sockets_lock:
+        socket = _sockets.get((host, port))
+        if socket is None:
+            socket = _sockets[(host, port)] = VolumioSocket(host, port)
+        return socket